@@ -7,6 +7,7 @@ from typing import List, Dict, Any
 from db_handler import Database
 import subprocess
 from ensure_directories import ensure_app_directories
+from format_detector import detect_format
 
 # Ensure all required directories exist
 ensure_app_directories()
@@ -117,6 +118,9 @@ class PDFConverterApp:
         label = ttk.Label(file_frame, text="Choose the respective file format", 
                   font=("Arial", 12, "bold"), foreground="#3C75A0")
         label.pack(pady=5)
+
+        ttk.Button(file_frame, text="Detect format from a PDF...",
+                  command=self.auto_detect).pack(fill=tk.X, pady=(0, 8))
                    
         ttk.Button(file_frame, text=["Task","/","Description","/","Documentation","/","Margin"] ,
                   command=self.tddm).pack(fill=tk.X, pady=2)
@@ -130,57 +134,48 @@ class PDFConverterApp:
         ttk.Button(file_frame, text=["Task","/","Description","/","MP/N","/","PN","/","Limit","/","Margin","/","Documentation"] ,
                   command=self.tdmplmd).pack(fill=tk.X, pady=2)
 
-    def tddm(self):
+    def run_converter(self, name: str, *args: str):
         if getattr(sys, 'frozen', False):
             # Running as compiled executable
             script_dir = os.path.dirname(sys.executable)
             if sys.platform == 'win32':
-                subprocess.run([os.path.join(script_dir, "tddm.exe")])
+                subprocess.run([os.path.join(script_dir, f"{name}.exe"), *args])
             else:
-                subprocess.run([os.path.join(script_dir, "tddm")])
+                subprocess.run([os.path.join(script_dir, name), *args])
         else:
             # Running in development environment
-            subprocess.run([sys.executable, "tddm.py"])
-        print("Executing tddm script!")
+            subprocess.run([sys.executable, f"{name}.py", *args])
+        print(f"Executing {name} script!")
 
-    def tddim(self):
-        if getattr(sys, 'frozen', False):
-            # Running as compiled executable
-            script_dir = os.path.dirname(sys.executable)
-            if sys.platform == 'win32':
-                subprocess.run([os.path.join(script_dir, "tddim.exe")])
-            else:
-                subprocess.run([os.path.join(script_dir, "tddim")])
+    def auto_detect(self):
+        _, input_dir = ensure_app_directories()
+        file_path = filedialog.askopenfilename(
+            initialdir=input_dir,
+            filetypes=[("PDF files", "*.pdf")]
+        )
+        if not file_path:
+            return
+
+        # Samples a few task pages only; the chosen converter opens with the file selected
+        name, scores = detect_format(file_path)
+        if scores:
+            message = f"Detected format: {name.upper()} (match {scores[name]:.0%}).\n\nOpen the {name.upper()} converter?"
         else:
-            # Running in development environment
-            subprocess.run([sys.executable, "tddim.py"])
-        print("Executing tddim script!")
+            message = f"No task numbers found in the sampled pages; defaulting to {name.upper()}.\n\nOpen the {name.upper()} converter?"
+        if messagebox.askyesno("Format Detection", message):
+            self.run_converter(name, file_path)
+
+    def tddm(self):
+        self.run_converter("tddm")
+
+    def tddim(self):
+        self.run_converter("tddim")
 
     def tdmplm(self):
-        if getattr(sys, 'frozen', False):
-            # Running as compiled executable
-            script_dir = os.path.dirname(sys.executable)
-            if sys.platform == 'win32':
-                subprocess.run([os.path.join(script_dir, "tdmplm.exe")])
-            else:
-                subprocess.run([os.path.join(script_dir, "tdmplm")])
-        else:
-            # Running in development environment
-            subprocess.run([sys.executable, "tdmplm.py"])
-        print("Executing tdmplm script!")
+        self.run_converter("tdmplm")
 
     def tdmplmd(self):
-        if getattr(sys, 'frozen', False):
-            # Running as compiled executable
-            script_dir = os.path.dirname(sys.executable)
-            if sys.platform == 'win32':
-                subprocess.run([os.path.join(script_dir, "tdmplmd.exe")])
-            else:
-                subprocess.run([os.path.join(script_dir, "tdmplmd")])
-        else:
-            # Running in development environment
-            subprocess.run([sys.executable, "tdmplmd.py"])
-        print("Executing tdmplmd script!")
+        self.run_converter("tdmplmd")
 
 if __name__ == "__main__":
     root = tk.Tk()
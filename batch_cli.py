@@ -0,0 +1,213 @@
+"""
+Headless batch extraction: every PDF under data/input (or the given
+paths/globs) through one converter, or "auto" to pick one per file.
+
+    python batch_cli.py [paths or globs ...] [--type auto|all|tddm|tddim|tdmplm|tdmplmd]
+                        [--workers N] [--backend pdfplumber|pypdf2|auto|words]
+                        [--export-dir DIR] [--export-format csv|xlsx] [--no-cache]
+                        [--bounded-memory] [--max-rss MB] [--timings]
+
+"all" produces every format from a single pass over each PDF (see
+extraction_engine.py). Files are spread across a pool of worker processes,
+one file per worker. Rows go to the application database (written by this
+process only, as is the page text store), as one document per PDF and
+format (see document_store.py), and to one export file per PDF and format.
+Nothing here imports tkinter.
+
+--bounded-memory reopens each PDF every few hundred pages and --max-rss
+caps every process's resident memory (see page_memory.py), for documents
+too large to hold in memory otherwise. --timings writes a per-stage timing
+report for the batch to data/timings (see timings.py).
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from db_handler import Database
+import document_store
+from ensure_directories import ensure_app_directories
+from extraction_engine import ExtractionEngine
+from format_detector import detect_format
+from format_processor import PDFProcessor
+from frame_builder import display_frame
+from page_memory import CHUNK_PAGES, set_limits
+from page_pipeline import default_workers
+import page_text_store
+from page_text_store import PageTextStore
+from text_backends import AUTO, BACKENDS, DEFAULT_BACKEND, WORDS, get_backend
+import timings
+
+CONVERTERS = ["tddm", "tddim", "tdmplm", "tdmplmd"]
+
+# Every converter's output from one pass over the PDF
+ALL = "all"
+
+
+def find_pdfs(inputs: List[str]) -> List[str]:
+    """PDFs matching the given files, directories or globs; data/input when empty."""
+    if not inputs:
+        _, input_dir = ensure_app_directories()
+        inputs = [input_dir]
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "**", "*.pdf"), recursive=True)
+            matches += glob.glob(os.path.join(item, "**", "*.PDF"), recursive=True)
+        else:
+            matches = glob.glob(item, recursive=True)
+        found.extend(path for path in matches if path.lower().endswith(".pdf"))
+    # Same file named twice (e.g. by a glob and a path) is processed once
+    return sorted(dict.fromkeys(os.path.abspath(path) for path in found))
+
+
+def page_count(pdf_path: str) -> int:
+    try:
+        return get_backend("pypdf2").page_count(pdf_path)
+    except Exception:
+        return get_backend("pdfplumber").page_count(pdf_path)
+
+
+def export_path(pdf_path: str, converter: str, export_dir: str, export_format: str) -> str:
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(export_dir, f"{stem}_{converter}.{export_format}")
+
+
+def _init_worker():
+    timings.reset()
+    # Page text goes back to the parent with the results, which stores it
+    page_text_store.defer_saves()
+
+
+def process_one(pdf_path: str, converter: str, processor_args: Dict[str, dict], backend: str,
+                use_cache: bool, export_dir: str,
+                export_format: str) -> Tuple[str, int, Dict[str, pd.DataFrame], float, Optional[dict], list]:
+    # Runs in a worker process; the database and page text store are only written by the parent
+    start = time.perf_counter()
+    if converter == ALL:
+        engine = ExtractionEngine(None, **processor_args[ALL])
+        frames = engine.extract_dataframes(pdf_path, workers=1, use_cache=use_cache, backend=backend)
+    else:
+        if converter == AUTO:
+            converter, _ = detect_format(pdf_path)
+        processor = PDFProcessor(None, **processor_args[converter])
+        frames = {converter: processor.extract_dataframe(pdf_path, workers=1, use_cache=use_cache,
+                                                         backend=backend)}
+
+    for name, df in frames.items():
+        target = export_path(pdf_path, name, export_dir, export_format)
+        with timings.stage("export"):
+            if export_format == "xlsx":
+                display_frame(df).to_excel(target, index=False, sheet_name='Extracted Data')
+            else:
+                display_frame(df).to_csv(target, index=False)
+    # Stage timings and page texts go back to the parent with the frames
+    return (pdf_path, page_count(pdf_path), frames, time.perf_counter() - start, timings.snapshot(),
+            page_text_store.take_deferred())
+
+
+def run_batch(pdf_paths: List[str], converter: str = AUTO, workers: int = None,
+              backend: str = DEFAULT_BACKEND, use_cache: bool = True, export_dir: Optional[str] = None,
+              export_format: str = "csv", db: Database = None) -> Dict[str, float]:
+    workers = workers or default_workers()
+    if export_dir is None:
+        data_dir, _ = ensure_app_directories()
+        export_dir = os.path.join(data_dir, "output")
+    os.makedirs(export_dir, exist_ok=True)
+    db = db if db is not None else Database()
+    store = PageTextStore()
+
+    # Workers rebuild processors from these, so e.g. MP/Ns known to the
+    # database reach them without each one opening it
+    processor_args = {}
+    # Processors here also name the rules each frame is stored under
+    processors = {name: PDFProcessor(db, name)
+                  for name in (CONVERTERS if converter in (AUTO, ALL) else [converter])}
+    if converter == ALL:
+        processor_args[ALL] = ExtractionEngine(db, CONVERTERS).worker_args()
+    else:
+        for name, processor in processors.items():
+            processor_args[name] = processor.worker_args()
+
+    totals = {"files": 0, "failed": 0, "pages": 0, "rows": 0}
+    start = time.perf_counter()
+    with timings.run("batch"), ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = {executor.submit(process_one, path, converter, processor_args, backend,
+                                   use_cache, export_dir, export_format): path
+                   for path in pdf_paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                path, pages, frames, elapsed, file_timings, page_texts = future.result()
+            except Exception as e:
+                print(f"{path}: error: {str(e)}")
+                totals["failed"] += 1
+                continue
+            timings.merge(file_timings)
+            store.save_all(page_texts)
+            for name, df in frames.items():
+                document_store.save_document(processors[name], db, path, df, backend,
+                                             source="batch", seconds=elapsed)
+            rows = sum(len(df) for df in frames.values())
+            timings.count("rows", rows)
+            totals["files"] += 1
+            totals["pages"] += pages
+            totals["rows"] += rows
+            print(f"{os.path.basename(path)}: {', '.join(frames)}, {pages} pages, {rows} rows in {elapsed:.1f}s")
+
+    totals["seconds"] = time.perf_counter() - start
+    return totals
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Extract every PDF in a folder without the GUI.")
+    parser.add_argument("inputs", nargs="*",
+                        help="PDF files, directories or globs (default: data/input)")
+    parser.add_argument("--type", default=AUTO, choices=[AUTO, ALL] + CONVERTERS,
+                        help="converter to use, auto to pick one per file or all for every "
+                             "format in one pass (default: auto)")
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="files processed at once (default: CPU count)")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, choices=list(BACKENDS) + [AUTO, WORDS],
+                        help=f"text extraction backend, or {WORDS} for table cells from word "
+                             f"positions (default: {DEFAULT_BACKEND})")
+    parser.add_argument("--export-dir", help="where per-file exports go (default: data/output)")
+    parser.add_argument("--export-format", default="csv", choices=["csv", "xlsx"])
+    parser.add_argument("--no-cache", action="store_true", help="ignore cached results")
+    parser.add_argument("--bounded-memory", action="store_true",
+                        help=f"reopen each PDF every {CHUNK_PAGES} pages to keep memory flat")
+    parser.add_argument("--max-rss", type=int, metavar="MB",
+                        help="stop a file whose process goes over this much resident memory "
+                             "(implies --bounded-memory)")
+    parser.add_argument("--timings", action="store_true",
+                        help="write a per-stage timing report to data/timings")
+    args = parser.parse_args(argv)
+    if args.timings:
+        timings.enable()
+    if args.bounded_memory or args.max_rss:
+        set_limits(CHUNK_PAGES, args.max_rss)
+
+    pdf_paths = find_pdfs(args.inputs)
+    if not pdf_paths:
+        print("No PDF files found")
+        return 1
+
+    print(f"Processing {len(pdf_paths)} PDF(s) with {args.workers} worker(s)")
+    totals = run_batch(pdf_paths, args.type, args.workers, args.backend, not args.no_cache,
+                       args.export_dir, args.export_format)
+    seconds = max(totals["seconds"], 1e-9)
+    print(f"{totals['files']} file(s) done, {totals['failed']} failed, "
+          f"{totals['pages']} pages, {totals['rows']} rows in {totals['seconds']:.1f}s")
+    print(f"{totals['pages'] / seconds:.1f} pages/sec, {totals['rows'] / seconds:.1f} rows/sec")
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
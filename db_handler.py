@@ -1,82 +1,551 @@
-import sqlite3
-import pandas as pd
-import os
-import sys
-from ensure_directories import ensure_app_directories
-
-class Database:
-    def __init__(self):
-        # Get data directory from ensure_directories module
-        data_dir, _ = ensure_app_directories()
-        
-        # Store database in data directory
-        self.db_path = os.path.join(data_dir, "pdf_data.db")
-        self.setup_database()
-
-    def setup_database(self):
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('DROP TABLE IF EXISTS pdf_data')
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS pdf_data (
-                        ata TEXT,
-                        task_number TEXT,
-                        description TEXT,
-                        mpn TEXT,
-                        pn TEXT,
-                        time_limit TEXT,
-                        lir_type TEXT,
-                        margin TEXT,
-                        reference TEXT
-                    )
-                ''')
-                conn.commit()
-        except Exception as e:
-            print(f"Database setup error: {str(e)}")
-
-    def save_processed_data(self, df: pd.DataFrame):
-        try:
-            # Convert DataFrame to list of tuples
-            data = df[["ATA", "Task Number", "Description", "MP/N", "PN", "Limit", "Type of LIR", "Margin", "Reference"]].values.tolist()
-            
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.executemany('''
-                    INSERT INTO pdf_data (
-                        ata, task_number, description, mpn, pn, 
-                        time_limit, lir_type, margin, reference
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', data)
-                conn.commit()
-        except Exception as e:
-            print(f"Save data error: {str(e)}")
-
-    def get_suggestions(self, column: str, partial_value: str, limit: int = 5):
-        try:
-            # Map column names
-            column_map = {
-                'ATA': 'ata',
-                'Task Number': 'task_number',
-                'Description': 'description',
-                'MP/N': 'mpn',
-                'PN': 'pn',
-                'Limit': 'time_limit',
-                'Type of LIR': 'lir_type',
-                'Margin': 'margin',
-                'Reference': 'reference'
-            }
-            db_column = column_map.get(column, column.lower())
-            
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute(f'''
-                    SELECT DISTINCT {db_column}
-                    FROM pdf_data 
-                    WHERE {db_column} LIKE ?
-                    LIMIT ?
-                ''', (f'%{partial_value}%', limit))
-                return [row[0] for row in cursor.fetchall() if row[0]]
-        except Exception as e:
-            print(f"Get suggestions error: {str(e)}")
-            return []
+import json
+import sqlite3
+import zlib
+from collections import Counter
+import pandas as pd
+import os
+from typing import Dict, Iterable, List, Optional
+from ensure_directories import ensure_app_directories
+from frame_builder import build_frame
+from limits import DERIVED_COLUMNS, LIMIT_COLUMNS, limit_cells
+from reference_store import pack, reference_id, unpack
+import timings
+
+
+# DataFrame column -> pdf_data column
+COLUMN_MAP = {
+    'ATA': 'ata',
+    'Task Number': 'task_number',
+    'Description': 'description',
+    'Documentation': 'documentation',
+    'MP/N': 'mpn',
+    'PN': 'pn',
+    'Limit': 'time_limit',
+    'Interval': 'time_limit',
+    'Limit Months': 'limit_months',
+    'Interval Months': 'limit_months',
+    'Limit FH': 'limit_fh',
+    'Interval FH': 'limit_fh',
+    'Type of LIR': 'lir_type',
+    'Margin': 'margin',
+    'Reference': 'reference'
+}
+
+
+def _add_column(cursor, table: str, column: str, definition: str):
+    # ALTER TABLE has no IF NOT EXISTS; databases made before versioning
+    # may already have the column
+    cursor.execute(f'PRAGMA table_info({table})')
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def _create_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pdf_data (
+            ata TEXT,
+            task_number TEXT,
+            description TEXT,
+            mpn TEXT,
+            pn TEXT,
+            time_limit TEXT,
+            lir_type TEXT,
+            margin TEXT,
+            reference TEXT
+        )
+    ''')
+    # pdf_data.reference holds a ref_id from here
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reference_texts (
+            ref_id TEXT PRIMARY KEY,
+            compressed INTEGER,
+            text BLOB
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS known_mpns (
+            mpn TEXT PRIMARY KEY
+        )
+    ''')
+    # MET / CMM references matched so far (see reference_registry)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS known_refs (
+            ref TEXT PRIMARY KEY
+        )
+    ''')
+    # Page fingerprints of each processed revision, and the rows
+    # extracted from each distinct page, per set of extraction rules
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS revision_pages (
+            doc_hash TEXT,
+            rules TEXT,
+            page_number INTEGER,
+            page_hash TEXT,
+            PRIMARY KEY (doc_hash, rules, page_number)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS revision_pages_hash ON revision_pages (page_hash, rules)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS page_rows (
+            page_hash TEXT,
+            rules TEXT,
+            rows BLOB,
+            PRIMARY KEY (page_hash, rules)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _add_limit_columns(cursor):
+    # Smallest value of time_limit in months / flight hours, for range queries
+    _add_column(cursor, 'pdf_data', 'limit_months', 'INTEGER')
+    _add_column(cursor, 'pdf_data', 'limit_fh', 'INTEGER')
+    cursor.execute('CREATE INDEX IF NOT EXISTS pdf_data_limit_months ON pdf_data (limit_months)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS pdf_data_limit_fh ON pdf_data (limit_fh)')
+
+
+def _add_documents(cursor):
+    # One row per PDF and converter, with the rules its pdf_data rows were
+    # extracted under (see document_store), and a log of processing runs
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS documents (
+            doc_id INTEGER PRIMARY KEY,
+            doc_hash TEXT NOT NULL,
+            converter TEXT NOT NULL,
+            rules TEXT,
+            file_name TEXT,
+            row_count INTEGER,
+            extracted_at TEXT,
+            UNIQUE (doc_hash, converter)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id INTEGER PRIMARY KEY,
+            doc_id INTEGER,
+            source TEXT,
+            seconds REAL,
+            started_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS runs_doc ON runs (doc_id)')
+    # NULL for rows saved outside a document (e.g. entered by hand)
+    _add_column(cursor, 'pdf_data', 'doc_id', 'INTEGER')
+    _add_column(cursor, 'pdf_data', 'documentation', 'TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS pdf_data_doc ON pdf_data (doc_id)')
+
+
+def _add_lookup_indexes(cursor):
+    cursor.execute('CREATE INDEX IF NOT EXISTS pdf_data_ata ON pdf_data (ata)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS pdf_data_task_number ON pdf_data (task_number)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS pdf_data_mpn ON pdf_data (mpn)')
+
+
+# Schema changes in order; a database's PRAGMA user_version is the number
+# of them applied. Append new ones, never edit or reorder released ones.
+MIGRATIONS = [
+    _create_tables,
+    _add_limit_columns,
+    _add_documents,
+    _add_lookup_indexes,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+class Database:
+    def __init__(self, db_path: str = None, compress_references: bool = True):
+        if db_path is None:
+            # Get data directory from ensure_directories module
+            data_dir, _ = ensure_app_directories()
+            
+            # Store database in data directory
+            db_path = os.path.join(data_dir, "pdf_data.db")
+        self.db_path = db_path
+        # Reference texts are stored once each, zlib-compressed unless disabled
+        self.compress_references = compress_references
+        self.setup_database()
+
+    def setup_database(self):
+        """Bring the database up to SCHEMA_VERSION; stored data is kept."""
+        try:
+            # Autocommit, so the migrations run in the one explicit transaction
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            try:
+                cursor = conn.cursor()
+                # Locked before reading the version: two processes starting
+                # together migrate once
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    version = cursor.execute('PRAGMA user_version').fetchone()[0]
+                    if version > SCHEMA_VERSION:
+                        print(f"Database setup warning: schema version {version} is newer than "
+                              f"this program's ({SCHEMA_VERSION})")
+                    for number in range(version, SCHEMA_VERSION):
+                        MIGRATIONS[number](cursor)
+                        cursor.execute(f'PRAGMA user_version = {number + 1}')
+                    cursor.execute('COMMIT')
+                except Exception:
+                    cursor.execute('ROLLBACK')
+                    raise
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Database setup error: {str(e)}")
+
+    def schema_version(self) -> int:
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                return conn.execute('PRAGMA user_version').fetchone()[0]
+        except Exception as e:
+            print(f"Schema version error: {str(e)}")
+            return 0
+
+    @timings.timed("db.save_processed_data")
+    def save_processed_data(self, df: pd.DataFrame):
+        # No converter has every column (none has "Type of LIR"): the missing
+        # ones are stored as NULL rather than failing the whole save
+        self.save_processed_rows(list(df.columns), df.itertuples(index=False, name=None))
+
+    @timings.timed("db.save_processed_rows")
+    def save_processed_rows(self, columns: List[str], rows: Iterable[tuple]):
+        """
+        Insert rows as they are produced (e.g. from PDFProcessor.iter_rows).
+        Columns a converter doesn't have are stored as NULL.
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                self._insert_rows(conn.cursor(), columns, rows)
+                conn.commit()
+        except Exception as e:
+            print(f"Save rows error: {str(e)}")
+
+    def _insert_rows(self, cursor, columns: List[str], rows: Iterable[tuple], doc_id: int = None):
+        positions = [(COLUMN_MAP[col], i) for i, col in enumerate(columns) if col in COLUMN_MAP]
+        integer_positions = [k for k, (name, _) in enumerate(positions) if name in ('limit_months', 'limit_fh')]
+        reference_position = next((k for k, (name, _) in enumerate(positions) if name == 'reference'), None)
+        db_columns = [name for name, _ in positions] + ['doc_id']
+        placeholders = ", ".join("?" for _ in db_columns)
+        references = {}
+        cursor.executemany(
+            f'INSERT INTO pdf_data ({", ".join(db_columns)}) VALUES ({placeholders})',
+            self._with_reference_ids(self._with_plain_integers(([row[i] for _, i in positions] + [doc_id]
+                                                                for row in rows),
+                                                               integer_positions),
+                                     reference_position, references)
+        )
+        self._save_reference_texts(cursor, references)
+
+    def find_document(self, doc_hash: str, converter: str, rules: str) -> Optional[int]:
+        """doc_id of the PDF's stored rows for ``converter`` if extracted under ``rules``."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT doc_id FROM documents WHERE doc_hash = ? AND converter = ? AND rules = ?',
+                               (doc_hash, converter, rules))
+                row = cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            print(f"Find document error: {str(e)}")
+            return None
+
+    @timings.timed("db.load_document")
+    def load_document(self, doc_id: int, columns: List[str]) -> Optional[pd.DataFrame]:
+        """A stored document's rows as the converter's DataFrame; None if they can't be."""
+        if any(col not in COLUMN_MAP for col in columns):
+            return None
+        db_columns = [COLUMN_MAP[col] for col in columns]
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT row_count FROM documents WHERE doc_id = ?', (doc_id,))
+                found = cursor.fetchone()
+                cursor.execute(f'SELECT {", ".join(db_columns)} FROM pdf_data WHERE doc_id = ? ORDER BY rowid',
+                               (doc_id,))
+                rows = cursor.fetchall()
+        except Exception as e:
+            print(f"Load document error: {str(e)}")
+            return None
+        if found is None or found[0] != len(rows):
+            # Rows deleted or edited away since: extract again
+            return None
+        if 'reference' in db_columns:
+            position = db_columns.index('reference')
+            texts = self.get_reference_texts(row[position] for row in rows if row[position] is not None)
+            rows = [row[:position] + (texts.get(row[position]),) + row[position + 1:] for row in rows]
+        return build_frame(rows, columns)
+
+    @timings.timed("db.save_document")
+    def save_document(self, doc_hash: str, converter: str, rules: str, file_name: str,
+                      df: pd.DataFrame) -> Optional[int]:
+        """
+        Store a PDF's rows for ``converter`` under its doc_id, replacing any
+        stored before; returns the doc_id.
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('INSERT OR IGNORE INTO documents (doc_hash, converter) VALUES (?, ?)',
+                               (doc_hash, converter))
+                cursor.execute('SELECT doc_id FROM documents WHERE doc_hash = ? AND converter = ?',
+                               (doc_hash, converter))
+                doc_id = cursor.fetchone()[0]
+                cursor.execute('DELETE FROM pdf_data WHERE doc_id = ?', (doc_id,))
+                self._insert_rows(cursor, list(df.columns), df.itertuples(index=False, name=None), doc_id)
+                self._delete_unused_reference_texts(cursor)
+                cursor.execute('UPDATE documents SET rules = ?, file_name = ?, row_count = ?, '
+                               'extracted_at = CURRENT_TIMESTAMP WHERE doc_id = ?',
+                               (rules, file_name, len(df), doc_id))
+                conn.commit()
+                return doc_id
+        except Exception as e:
+            print(f"Save document error: {str(e)}")
+            return None
+
+    @timings.timed("db.update_document_cell")
+    def update_document_cell(self, doc_id: int, row_index: int, column: str, value) -> bool:
+        """
+        Set one cell of a stored document in place: row ``row_index`` in
+        load_document's order. A Limit/Interval is parsed again and its
+        months and flight hours set in the same update; those aren't set on
+        their own (see limits). Returns whether a row was updated.
+        """
+        if column not in COLUMN_MAP or column in DERIVED_COLUMNS:
+            return False
+        cells = limit_cells(column, value) if column in LIMIT_COLUMNS else {column: value}
+        updates = {COLUMN_MAP[name]: cell_value for name, cell_value in cells.items()}
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                for db_column in ('limit_months', 'limit_fh'):
+                    if db_column in updates:
+                        updates[db_column] = next(self._with_plain_integers([[updates[db_column]]], [0]))[0]
+                if updates.get('reference') is not None:
+                    references = {updates['reference']: reference_id(updates['reference'])}
+                    self._save_reference_texts(cursor, references)
+                    updates['reference'] = references[updates['reference']]
+                cursor.execute(f'UPDATE pdf_data SET {", ".join(f"{name} = ?" for name in updates)} WHERE rowid = '
+                               f'(SELECT rowid FROM pdf_data WHERE doc_id = ? ORDER BY rowid LIMIT 1 OFFSET ?)',
+                               list(updates.values()) + [doc_id, row_index])
+                updated = cursor.rowcount == 1
+                if 'reference' in updates:
+                    self._delete_unused_reference_texts(cursor)
+                conn.commit()
+                return updated
+        except Exception as e:
+            print(f"Update cell error: {str(e)}")
+            return False
+
+    def record_run(self, doc_id: int, source: str, seconds: float):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute('INSERT INTO runs (doc_id, source, seconds) VALUES (?, ?, ?)',
+                             (doc_id, source, seconds))
+                conn.commit()
+        except Exception as e:
+            print(f"Record run error: {str(e)}")
+
+    @staticmethod
+    def _with_plain_integers(rows: Iterable[list], positions: List[int]):
+        # DataFrame integers arrive as numpy ints or pd.NA, which sqlite3 can't
+        # bind, and edited table cells as text
+        for row in rows:
+            for position in positions:
+                value = row[position]
+                try:
+                    row[position] = None if pd.isna(value) else int(value)
+                except (TypeError, ValueError):
+                    row[position] = None
+            yield row
+
+    @staticmethod
+    def _with_reference_ids(rows: Iterable[list], position: int, references: Dict[str, str]):
+        # Swaps each row's reference text for its ref_id, collecting text -> ref_id
+        for row in rows:
+            text = row[position] if position is not None else None
+            if text is not None:
+                ref_id = references.get(text)
+                if ref_id is None:
+                    ref_id = references[text] = reference_id(text)
+                row[position] = ref_id
+            yield tuple(row)
+
+    def _save_reference_texts(self, cursor, references: Dict[str, str]):
+        cursor.executemany('INSERT OR IGNORE INTO reference_texts (ref_id, text, compressed) VALUES (?, ?, ?)',
+                           ((ref_id, *pack(text, self.compress_references)) for text, ref_id in references.items()))
+
+    @staticmethod
+    def _delete_unused_reference_texts(cursor):
+        # Texts no row refers to any more, once rows are replaced or edited
+        cursor.execute('DELETE FROM reference_texts WHERE ref_id NOT IN '
+                       '(SELECT reference FROM pdf_data WHERE reference IS NOT NULL)')
+
+    def get_reference_texts(self, ref_ids: Iterable[str]) -> Dict[str, str]:
+        """Reference text for each of the given ref_ids stored in pdf_data.reference."""
+        ref_ids = list(dict.fromkeys(ref_ids))
+        texts = {}
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                # Stay under SQLite's bound-parameter limit
+                for start in range(0, len(ref_ids), 500):
+                    chunk = ref_ids[start:start + 500]
+                    cursor.execute(f'SELECT ref_id, text, compressed FROM reference_texts WHERE ref_id IN '
+                                   f'({", ".join("?" for _ in chunk)})', chunk)
+                    texts.update((ref_id, unpack(text, compressed)) for ref_id, text, compressed in cursor.fetchall())
+        except Exception as e:
+            print(f"Get reference texts error: {str(e)}")
+        return texts
+
+    @timings.timed("db.get_page_rows")
+    def get_page_rows(self, rules: str, page_hashes: Iterable[str]) -> Dict[str, List[tuple]]:
+        """Stored rows of each of the given pages that were extracted under ``rules``."""
+        page_hashes = list(dict.fromkeys(page_hashes))
+        found = {}
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(page_hashes), 500):
+                    chunk = page_hashes[start:start + 500]
+                    cursor.execute(f'SELECT page_hash, rows FROM page_rows WHERE rules = ? AND page_hash IN '
+                                   f'({", ".join("?" for _ in chunk)})', [rules] + chunk)
+                    found.update((page_hash, [tuple(row) for row in json.loads(zlib.decompress(rows))])
+                                 for page_hash, rows in cursor.fetchall())
+        except Exception as e:
+            print(f"Get page rows error: {str(e)}")
+        return found
+
+    def find_previous_revision(self, doc_hash: str, rules: str, page_hashes: Iterable[str]) -> Optional[str]:
+        """The other stored revision sharing the most pages with this one."""
+        page_hashes = list(dict.fromkeys(page_hashes))
+        shared = Counter()
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(page_hashes), 500):
+                    chunk = page_hashes[start:start + 500]
+                    cursor.execute(f'SELECT doc_hash FROM revision_pages WHERE rules = ? AND doc_hash != ? '
+                                   f'AND page_hash IN ({", ".join("?" for _ in chunk)})', [rules, doc_hash] + chunk)
+                    shared.update(found for found, in cursor.fetchall())
+        except Exception as e:
+            print(f"Find previous revision error: {str(e)}")
+        return shared.most_common(1)[0][0] if shared else None
+
+    def get_revision_pages(self, doc_hash: str, rules: str) -> List[str]:
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT page_hash FROM revision_pages WHERE doc_hash = ? AND rules = ? '
+                               'ORDER BY page_number', (doc_hash, rules))
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Get revision pages error: {str(e)}")
+            return []
+
+    @timings.timed("db.save_revision")
+    def save_revision(self, doc_hash: str, rules: str, page_hashes: List[str],
+                      page_rows: Dict[str, List[tuple]]):
+        """Record a revision's pages, and the rows of pages not stored before."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany('INSERT OR IGNORE INTO page_rows (page_hash, rules, rows) VALUES (?, ?, ?)',
+                                   ((page_hash, rules, zlib.compress(json.dumps(rows).encode('utf-8')))
+                                    for page_hash, rows in page_rows.items()))
+                cursor.execute('DELETE FROM revision_pages WHERE doc_hash = ? AND rules = ?', (doc_hash, rules))
+                cursor.executemany('INSERT INTO revision_pages (doc_hash, rules, page_number, page_hash) '
+                                   'VALUES (?, ?, ?, ?)',
+                                   ((doc_hash, rules, page_number, page_hash)
+                                    for page_number, page_hash in enumerate(page_hashes, 1)))
+                conn.commit()
+        except Exception as e:
+            print(f"Save revision error: {str(e)}")
+
+    def get_tasks_within(self, months: int = None, flight_hours: int = None) -> pd.DataFrame:
+        """
+        Stored rows whose limit is at most ``months`` months or at most
+        ``flight_hours`` flight hours (either bound may be left out),
+        found through the limit indexes.
+        """
+        conditions, params = [], []
+        for column, bound in [('limit_months', months), ('limit_fh', flight_hours)]:
+            if bound is not None:
+                conditions.append(f'{column} <= ?')
+                params.append(bound)
+        columns = ['ata', 'task_number', 'description', 'mpn', 'pn', 'time_limit', 'limit_months', 'limit_fh']
+        if not conditions:
+            return pd.DataFrame(columns=columns)
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                return pd.read_sql_query(f'SELECT {", ".join(columns)} FROM pdf_data '
+                                         f'WHERE {" OR ".join(conditions)}', conn, params=params)
+        except Exception as e:
+            print(f"Get tasks within limit error: {str(e)}")
+            return pd.DataFrame(columns=columns)
+
+    def get_known_mpns(self) -> List[str]:
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT mpn FROM known_mpns ORDER BY rowid')
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Get known MP/Ns error: {str(e)}")
+            return []
+
+    def add_known_mpns(self, mpns: Iterable[str]):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany('INSERT OR IGNORE INTO known_mpns (mpn) VALUES (?)',
+                                   ((mpn,) for mpn in mpns))
+                conn.commit()
+        except Exception as e:
+            print(f"Add known MP/Ns error: {str(e)}")
+
+    def get_known_refs(self) -> List[str]:
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT ref FROM known_refs ORDER BY rowid')
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Get known references error: {str(e)}")
+            return []
+
+    def add_known_refs(self, refs: Iterable[str]):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany('INSERT OR IGNORE INTO known_refs (ref) VALUES (?)',
+                                   ((ref,) for ref in refs))
+                conn.commit()
+        except Exception as e:
+            print(f"Add known references error: {str(e)}")
+
+    def get_suggestions(self, column: str, partial_value: str, limit: int = 5):
+        try:
+            db_column = COLUMN_MAP.get(column, column.lower())
+            
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                if db_column == 'reference':
+                    # Reference texts live, possibly compressed, in reference_texts
+                    cursor.execute('SELECT text, compressed FROM reference_texts')
+                    matches = []
+                    for text, compressed in cursor:
+                        text = unpack(text, compressed)
+                        if partial_value.lower() in text.lower():
+                            matches.append(text)
+                            if len(matches) >= limit:
+                                break
+                    return matches
+                cursor.execute(f'''
+                    SELECT DISTINCT {db_column}
+                    FROM pdf_data 
+                    WHERE {db_column} LIKE ?
+                    LIMIT ?
+                ''', (f'%{partial_value}%', limit))
+                return [row[0] for row in cursor.fetchall() if row[0]]
+        except Exception as e:
+            print(f"Get suggestions error: {str(e)}")
+            return []
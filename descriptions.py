@@ -0,0 +1,153 @@
+"""
+Where a task's description starts and ends in its context.
+
+The description is the text after the task number up to the first of the
+layout's end patterns (patterns.DESCRIPTION_END_DOC / _LIMIT), or to the
+end of the context. It used to be one regex, ``task\\s*(.*?)(?=end|$)``,
+whose lazy group tried every end pattern again at each character, with a
+line-by-line fallback behind it for when that found nothing.
+
+description_after finds the same text in place in the page text with one
+search for the end, scanning forward only from the task number the
+context was found by (see extraction_engine.TaskSpan). Contexts are one
+line -- their newlines read as spaces -- so the old fallback, which skipped
+lines holding a task number, never found anything in them: an empty
+description is "-".
+
+Task contexts recorded from sample manuals, and hand-written awkward ones,
+are kept in tests/data/description_contexts.json; the tests check
+description_after against the old regex on them. Run this module on PDFs
+to do the same on their contexts and time both, or with --record to add
+their contexts to the recorded ones.
+"""
+import patterns
+
+
+def clean_description(text: str) -> str:
+    # No parenthetical content, single spaces, no leading dash
+    text = " ".join(patterns.PARENTHETICAL.sub('', text).split())
+    if text.startswith("-"):
+        text = text[1:].lstrip()
+    return text
+
+
+def description_after(text: str, pos: int, endpos: int, end_pattern) -> str:
+    """
+    The description of a context searched in place: the task number ends
+    at ``pos``, the context at ``endpos``, and the text has no newlines.
+    """
+    start = patterns.LEADING_WHITESPACE.match(text, pos, endpos).end()
+    end = end_pattern.search(text, start, endpos)
+    return clean_description(text[start:end.start() if end else endpos]) or "-"
+
+
+_LEGACY_END = {
+    "doc": r"ALL\s+MP/N|\d{6}|\d{3}[A-Z]|\b\d+\s*[MF]H|\bMET|\bMET|$",
+    "limit": r"ALL\s+MP/N|\d{6}|\d{3}[A-Z]|\b\d+\s*[MF]H|\bTSM|\bTSI|$",
+}
+
+
+def _legacy_description(text: str, layout: str) -> str:
+    # The lazy-lookahead regex and three-search fallback description_after replaces
+    import re
+
+    match = re.search(r"\b\d{2}/\d{2}/\d{2}/\d{3}/\d{3}/\d{3}\b\s*(.*?)(?=" + _LEGACY_END[layout] + ")", text)
+
+    def clean(text):
+        text = re.sub(r"\([^)]*\)", '', text)
+        text = re.sub(r"\s+", ' ', text)
+        text = re.sub(r"^\s*-\s*", '', text)
+        return text.strip()
+
+    if match:
+        desc = clean(match.group(1).strip())
+        if desc:
+            return desc
+    for line in text.split('\n'):
+        if (re.search(r"\b\d{2}/\d{2}/\d{2}/\d{3}/\d{3}/\d{3}\b", line)
+                or re.search(r"\bALL\s+MP/N\b|\b\d{6}\b|\b\d{3}[A-Z]", line)
+                or re.search(r"\b\d+\s*[MF]H\b|\bTSM\b|\bTSI\b", line)):
+            continue
+        line = clean(line)
+        if line:
+            return line
+    return "-"
+
+
+_END_PATTERNS = {"doc": patterns.DESCRIPTION_END_DOC, "limit": patterns.DESCRIPTION_END_LIMIT}
+
+
+def _contexts_path() -> str:
+    import os
+
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "data", "description_contexts.json")
+
+
+def _contexts(pdf_paths: list) -> list:
+    # Every task's context as the engine builds it, from both text backends
+    from extraction_engine import task_spans
+    from text_backends import get_backend
+
+    return [span.context for pdf_path in pdf_paths for backend in ["pdfplumber", "pypdf2"]
+            for _, text in get_backend(backend).iter_texts(pdf_path) if text
+            for span in task_spans(text)]
+
+
+def _record(pdf_paths: list):
+    import json
+
+    path = _contexts_path()
+    with open(path, "r", encoding="utf-8") as f:
+        recorded = json.load(f)
+    contexts = list(dict.fromkeys(recorded + _contexts(pdf_paths)))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(contexts, f, indent=0)
+        f.write("\n")
+    print(f"{len(contexts) - len(recorded)} contexts added, {len(contexts)} recorded")
+
+
+def _compare(pdf_paths: list):
+    import time
+
+    from extraction_engine import task_spans
+
+    spans = [span for context in _contexts(pdf_paths) for span in task_spans(context)]
+    for layout, end_pattern in _END_PATTERNS.items():
+        start = time.perf_counter()
+        old = [_legacy_description(span.context, layout) for span in spans]
+        old_time = time.perf_counter() - start
+        start = time.perf_counter()
+        new = [description_after(span.text, span.task_end, span.end, end_pattern) for span in spans]
+        new_time = time.perf_counter() - start
+        mismatches = [(span.context, a, b) for span, a, b in zip(spans, old, new) if a != b]
+        for text, a, b in mismatches[:5]:
+            print(f"  {text[:80]!r}: {a!r} != {b!r}")
+        print(f"{layout:>5}: {len(spans)} contexts, {len(mismatches)} mismatches, "
+              f"regex {old_time:.3f}s, scanner {new_time:.3f}s")
+
+
+def _benchmark():
+    # Cost per character (ns) of very long contexts with no end pattern
+    import time
+
+    task = "12/34/56/789/012/345"
+    for size in [1000, 4000, 16000, 64000]:
+        text = task + " CHECK SEAL AND HOSE" * (size // 20)
+        costs = []
+        for run in [lambda: _legacy_description(text, "doc"),
+                    lambda: description_after(text, len(task), len(text), patterns.DESCRIPTION_END_DOC)]:
+            start = time.perf_counter()
+            run()
+            costs.append((time.perf_counter() - start) / len(text) * 1e9)
+        print(f"  {len(text):>6} chars: regex {costs[0]:8.1f} ns/char, scanner {costs[1]:6.1f} ns/char")
+
+
+if __name__ == "__main__":
+    # python descriptions.py [--record] pdf ...
+    import sys
+
+    if sys.argv[1:2] == ["--record"]:
+        _record(sys.argv[2:])
+    else:
+        _compare(sys.argv[1:])
+        _benchmark()
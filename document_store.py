@@ -0,0 +1,91 @@
+"""
+Extraction results kept in the database across sessions.
+
+Every PDF a converter processes is a row of the documents table, keyed by
+the SHA-256 of its bytes and the converter, recording the extraction rules
+(result_cache.rules_key) its rows in pdf_data were produced under.
+Processing the same PDF again under the same rules reads those rows back
+instead of extracting; under other rules -- an edited pattern, another
+backend, a new known MP/N -- it extracts and replaces them. Each run is
+logged in the runs table with where its rows came from. Cells edited in
+the converters' tables are updated in place in the document's rows (see
+Database.update_document_cell), so they are read back with it.
+
+Run this module on a PDF to time an extraction against a database read.
+"""
+import os
+import time
+from typing import Optional, Tuple
+
+import pandas as pd
+
+import result_cache
+import timings
+from text_backends import DEFAULT_BACKEND
+
+
+def _document_key(processor, pdf_path: str, backend: str):
+    with timings.stage("document_store.key"):
+        return (result_cache.file_hash(pdf_path), result_cache.converter_name(processor),
+                result_cache.rules_key(processor, backend))
+
+
+def load_or_extract(processor, db, pdf_path: str, workers: int = 1, use_cache: bool = True,
+                    backend: str = DEFAULT_BACKEND) -> Tuple[pd.DataFrame, Optional[int]]:
+    """
+    The PDF's stored rows if it was processed under the same rules, else
+    extracted and stored; and the doc_id they are stored under (None if
+    they couldn't be).
+    """
+    start = time.perf_counter()
+    doc_hash, converter, rules = _document_key(processor, pdf_path, backend)
+    doc_id = db.find_document(doc_hash, converter, rules) if use_cache else None
+    df = db.load_document(doc_id, processor.columns) if doc_id is not None else None
+    source = "database"
+    if df is None:
+        with timings.stage("extract"):
+            df = processor.extract_dataframe(pdf_path, workers, use_cache, backend)
+        doc_id = db.save_document(doc_hash, converter, rules, os.path.basename(pdf_path), df)
+        source = "extracted"
+    if doc_id is not None:
+        db.record_run(doc_id, source, time.perf_counter() - start)
+    return df, doc_id
+
+
+def save_document(processor, db, pdf_path: str, df: pd.DataFrame, backend: str = DEFAULT_BACKEND,
+                  source: str = "extracted", seconds: float = 0.0) -> Optional[int]:
+    """Store rows extracted elsewhere (a revision, a batch worker) as the PDF's document."""
+    doc_hash, converter, rules = _document_key(processor, pdf_path, backend)
+    doc_id = db.save_document(doc_hash, converter, rules, os.path.basename(pdf_path), df)
+    if doc_id is not None:
+        db.record_run(doc_id, source, seconds)
+    return doc_id
+
+
+def _compare(pdf_path: str, converter: str = "tdmplm"):
+    import tempfile
+
+    from db_handler import Database
+    from format_processor import PDFProcessor
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "documents.db"))
+        processor = PDFProcessor(db, converter)
+        costs = []
+        for label in ["extracted", "database"]:
+            start = time.perf_counter()
+            # No result cache, so the first run really extracts
+            df, _ = load_or_extract(processor, db, pdf_path, use_cache=label == "database")
+            costs.append(time.perf_counter() - start)
+            print(f"{label:>9}: {len(df)} rows in {costs[-1] * 1e3:.1f} ms")
+            if label == "extracted":
+                extracted = df
+        assert df.astype(object).equals(extracted.astype(object))
+        print(f"database read {costs[0] / costs[1]:.1f}x faster, same rows")
+
+
+if __name__ == "__main__":
+    # python document_store.py <pdf> [converter]
+    import sys
+
+    _compare(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "tdmplm")
@@ -0,0 +1,567 @@
+"""
+One pass over a PDF's task lines for any combination of output formats.
+
+Each format (TDDM, TDDIM, TDMPLM, TDMPLMD) is a FormatSchema: its columns,
+each taken from a named field of the task line (or a constant), plus the
+field whose items fan out into one row each. Fields are computed by the
+extractors registered in FIELD_EXTRACTORS, lazily and at most once per
+task line, so formats that share a field (ATA, task number, limit, ...)
+share the work, and a page is scanned for task numbers once however
+many formats are requested; each task's fields are then searched for in
+place within its span of the page (see TaskSpan).
+
+format_processor.PDFProcessor is a single-format engine; batch
+jobs that want several formats use ExtractionEngine directly. Run this
+module on a PDF to compare the four converters against one engine pass.
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+import pandas as pd
+
+import page_pipeline
+import patterns
+import result_cache
+from descriptions import clean_description, description_after
+from frame_builder import FrameBuilder
+from limits import Limit, parse_limit
+from mpn_catalog import MPNCatalog, load_catalog
+from mpn_matcher import MPN_PATTERNS, MPNMatcher
+from reference_registry import shared_registry
+from text_backends import DEFAULT_BACKEND
+
+
+class Field:
+    """Column value: a field of the task line."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __call__(self, values, item):
+        return values[self.name]
+
+
+class Attribute(Field):
+    """Column value: one attribute of a field of the task line."""
+
+    def __init__(self, name: str, attribute: str):
+        super().__init__(name)
+        self.attribute = attribute
+
+    def __call__(self, values, item):
+        return getattr(values[self.name], self.attribute)
+
+
+class Item:
+    """Column value: the fan-out item, or one element of it."""
+
+    def __init__(self, index: int = None):
+        self.index = index
+
+    def __call__(self, values, item):
+        return item if self.index is None else item[self.index]
+
+
+class Const:
+    """Column value: the same for every row."""
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __call__(self, values, item):
+        return self.value
+
+
+class FormatSchema:
+    def __init__(self, name: str, fan_out: str, columns: List[Tuple[str, Callable]]):
+        self.name = name
+        self.fan_out = fan_out
+        self.columns = [title for title, _ in columns]
+        self.sources = [source for _, source in columns]
+        self.fields = {fan_out} | {source.name for source in self.sources if isinstance(source, Field)}
+
+    def rows(self, values) -> Iterator[tuple]:
+        for item in values[self.fan_out]:
+            yield tuple(source(values, item) for source in self.sources)
+
+
+FORMATS = {schema.name: schema for schema in [
+    FormatSchema("tddm", fan_out="documentation_refs", columns=[
+        ("ATA", Field("ata")),
+        ("Task Number", Field("task_number")),
+        ("Description", Field("description_before_doc")),
+        ("Documentation", Item()),
+        ("Margin", Const("0")),
+        ("Reference", Field("context")),
+    ]),
+    # Fans out over the characters of the joined MET references -- one row
+    # per character, each carrying the whole string -- as TDDIM always has
+    FormatSchema("tddim", fan_out="met_refs_joined", columns=[
+        ("ATA", Field("ata")),
+        ("Task Number", Field("task_number")),
+        ("Description", Field("description_before_doc")),
+        ("Documentation", Field("met_refs_joined")),
+        ("Interval", Attribute("limit", "text")),
+        ("Interval Months", Attribute("limit", "months")),
+        ("Interval FH", Attribute("limit", "flight_hours")),
+        ("Margin", Const("0")),
+        ("Reference", Field("context")),
+    ]),
+    FormatSchema("tdmplm", fan_out="mpn_pn_pairs", columns=[
+        ("ATA", Field("ata")),
+        ("Task Number", Field("task_number")),
+        ("Description", Field("description_before_limit")),
+        ("MP/N", Item(0)),
+        ("PN", Item(1)),
+        ("Limit", Attribute("limit", "text")),
+        ("Limit Months", Attribute("limit", "months")),
+        ("Limit FH", Attribute("limit", "flight_hours")),
+        ("Margin", Const("0")),
+        ("Reference", Field("context")),
+    ]),
+    FormatSchema("tdmplmd", fan_out="mpn_pn_pairs", columns=[
+        ("ATA", Field("ata")),
+        ("Task Number", Field("task_number")),
+        ("Description", Field("description_before_limit")),
+        ("MP/N", Item(0)),
+        ("PN", Item(1)),
+        ("Limit", Attribute("limit", "text")),
+        ("Limit Months", Attribute("limit", "months")),
+        ("Limit FH", Attribute("limit", "flight_hours")),
+        ("Margin", Const("0")),
+        ("Documentation", Field("first_met_ref")),
+        ("Reference", Field("context")),
+    ]),
+]}
+
+# Fields that resolve part numbers against the MP/N catalog
+MPN_FIELDS = {"mpn_pn_pairs"}
+
+
+class TaskSpan:
+    """
+    A task on a page of text: the line holding its task number and the two
+    after it -- the task's context -- as offsets into the page text with
+    newlines read as spaces, which is how the context has always been
+    joined. Extractors search the context in place with a compiled
+    pattern's pos/endpos rather than a copy of it.
+    """
+    __slots__ = ("text", "start", "task_start", "task_end", "line_end", "end", "_context")
+
+    def __init__(self, text: str, start: int, task_start: int, task_end: int, line_end: int, end: int):
+        self.text = text
+        self.start = start
+        self.task_start = task_start
+        self.task_end = task_end
+        self.line_end = line_end
+        self.end = end
+        self._context = None
+
+    @property
+    def context(self) -> str:
+        if self._context is None:
+            self._context = self.text[self.start:self.end]
+        return self._context
+
+
+def task_spans(text: str) -> Iterator[TaskSpan]:
+    """A TaskSpan for each line of a page of text that holds a task number, from one scan of the page."""
+    flat = text.replace('\n', ' ')
+    size = len(text)
+    pos = 0
+    while True:
+        task = patterns.TASK_NUMBER_SCAN.search(text, pos)
+        if task is None:
+            return
+        task_start, task_end = task.start() - 2, task.end()
+        start = text.rfind('\n', 0, task_start) + 1
+        # The context runs to the end of the second line after the task's
+        line_end = text.find('\n', task_end)
+        if line_end < 0:
+            line_end = end = size
+        else:
+            end = text.find('\n', line_end + 1)
+            if end >= 0:
+                end = text.find('\n', end + 1)
+            if end < 0:
+                end = size
+        yield TaskSpan(flat, start, task_start, task_end, line_end, end)
+        # A task per line, however many task numbers it holds: the scan
+        # picks up again on the next line
+        pos = line_end + 1
+
+
+# Field extractors: (engine, span) -> value, for a TaskSpan of page text
+FIELD_EXTRACTORS: Dict[str, Callable[["ExtractionEngine", TaskSpan], Any]] = {}
+
+
+def field_extractor(name: str):
+    def register(function):
+        FIELD_EXTRACTORS[name] = function
+        return function
+    return register
+
+
+@field_extractor("context")
+def extract_context(engine, span: TaskSpan) -> str:
+    return span.context
+
+
+@field_extractor("ata")
+def extract_ata(engine, span: TaskSpan) -> str:
+    # From the task number the span was found by, or an "ATA 62-11" on its line
+    match = patterns.ATA_FROM_TASK.match(span.text, span.task_start)
+    if match:
+        return f"{match.group(1)}-{match.group(2)}"
+    match = patterns.ATA_LABEL.search(span.text, span.start, span.line_end)
+    if match:
+        return f"{match.group(1)}-{match.group(2)}"
+    return ""
+
+
+@field_extractor("task_number")
+def extract_task_number(engine, span: TaskSpan) -> str:
+    return span.text[span.task_start:span.task_end]
+
+
+@field_extractor("description_before_doc")
+def extract_description_before_doc(engine, span: TaskSpan) -> str:
+    # Documentation layouts: the description ends at a MET reference
+    return description_after(span.text, span.task_end, span.end, patterns.DESCRIPTION_END_DOC)
+
+
+@field_extractor("description_before_limit")
+def extract_description_before_limit(engine, span: TaskSpan) -> str:
+    # Part-number layouts: the description ends at a TSM/TSI limit
+    return description_after(span.text, span.task_end, span.end, patterns.DESCRIPTION_END_LIMIT)
+
+
+# The helpers below search text[start:end] in place (end None: to the end of the text)
+
+def _documentation_refs(engine, text: str, start: int = 0, end: int = None) -> List[str]:
+    # Unique "MET XX.XX.XX.XXX" / "CMM XX.XX.XX" references, normalized, in order of appearance
+    ref_matches = {}
+    for match in patterns.MET_OR_CMM_REF.finditer(text, start, len(text) if end is None else end):
+        ref_matches[engine.known_refs.add(match.group(1))] = None
+    return list(ref_matches)
+
+
+def _met_refs_joined(engine, text: str, start: int = 0, end: int = None) -> str:
+    ref_matches = []
+    for match in patterns.MET_REF.finditer(text, start, len(text) if end is None else end):
+        ref_matches.append(engine.known_refs.add(match.group(1)))
+    return " ".join(ref_matches)
+
+
+def _first_met_ref(engine, text: str, start: int = 0, end: int = None) -> str:
+    # None when the text has no MET reference
+    for match in patterns.MET_REF.finditer(text, start, len(text) if end is None else end):
+        return engine.known_refs.add(match.group(1))
+    return None
+
+
+def _resolve_mpn(engine, mpn: str) -> str:
+    # Try to match with known patterns
+    formatted = engine.mpn_matcher.match(mpn)
+    if formatted is not None:
+        mpn = formatted
+
+    # Check if similar to known MP/Ns
+    return engine.known_mpns.resolve(mpn)
+
+
+@field_extractor("documentation_refs")
+def extract_documentation_refs(engine, span: TaskSpan) -> List[str]:
+    return _documentation_refs(engine, span.text, span.start, span.end)
+
+
+@field_extractor("met_refs_joined")
+def extract_met_refs_joined(engine, span: TaskSpan) -> str:
+    return _met_refs_joined(engine, span.text, span.start, span.end)
+
+
+@field_extractor("first_met_ref")
+def extract_first_met_ref(engine, span: TaskSpan) -> str:
+    return _first_met_ref(engine, span.text, span.start, span.end)
+
+
+@field_extractor("limit")
+def extract_limit(engine, span: TaskSpan) -> Limit:
+    return parse_limit(span.text, span.start, span.end)
+
+
+def _mpn_pn_pairs(engine, text: str, start: int = 0, end: int = None) -> List[tuple]:
+    end = len(text) if end is None else end
+    # First try to find "ALL MP/N"
+    if patterns.ALL_MPN.search(text, start, end):
+        return [("ALL MP/N", "-")]
+
+    mpn_matches = []
+    pn_map = {}
+
+    # Look for MP/N with PN in parentheses
+    for match in patterns.MPN_WITH_PN.finditer(text, start, end):
+        mpn = _resolve_mpn(engine, match.group(1).strip())
+        pn = match.group(2).strip()
+        if pn != "-":
+            pn_map[mpn] = pn
+        mpn_matches.append(mpn)
+
+    # If no matches found with parentheses, look for standalone MP/Ns
+    if not mpn_matches:
+        for mpn in engine.mpn_matcher.find_all(text[start:end]):
+            mpn = engine.known_mpns.resolve(mpn)
+            if mpn not in mpn_matches:
+                mpn_matches.append(mpn)
+
+    if not mpn_matches:
+        return [("-", "-")]
+
+    return [(mpn, pn_map.get(mpn, "-")) for mpn in mpn_matches]
+
+
+@field_extractor("mpn_pn_pairs")
+def extract_mpn_pn(engine, span: TaskSpan) -> List[tuple]:
+    return _mpn_pn_pairs(engine, span.text, span.start, span.end)
+
+
+# Cell field extractors: (engine, record) -> value, for the table cells
+# word_columns reads from word positions. A record maps each column
+# (word_columns.COLUMNS) to its lines as (line number, text) pairs; a
+# column the page doesn't have is missing, and its fields fall back to
+# the whole record as the line extractors do.
+CELL_FIELD_EXTRACTORS: Dict[str, Callable[["ExtractionEngine", Dict[str, list]], Any]] = {}
+
+
+def cell_field_extractor(name: str):
+    def register(function):
+        CELL_FIELD_EXTRACTORS[name] = function
+        return function
+    return register
+
+
+def _cell(record: Dict[str, list], column: str) -> str:
+    return " ".join(text for _, text in record.get(column, ()))
+
+
+def _cell_or_record(record: Dict[str, list], column: str) -> str:
+    return _cell(record, column) if column in record else _record_text(record)
+
+
+def _record_text(record: Dict[str, list]) -> str:
+    return " ".join(_cell(record, column) for column in record)
+
+
+@cell_field_extractor("context")
+def extract_cell_context(engine, record) -> str:
+    return _record_text(record)
+
+
+@cell_field_extractor("ata")
+def extract_cell_ata(engine, record) -> str:
+    match = patterns.ATA_FROM_TASK.search(_cell(record, "Task"))
+    if match:
+        return f"{match.group(1)}-{match.group(2)}"
+    match = patterns.ATA_LABEL.search(_record_text(record))
+    if match:
+        return f"{match.group(1)}-{match.group(2)}"
+    return ""
+
+
+@cell_field_extractor("task_number")
+def extract_cell_task_number(engine, record) -> str:
+    match = patterns.TASK_NUMBER.search(_cell(record, "Task"))
+    return match.group(0) if match else ""
+
+
+@cell_field_extractor("description_before_doc")
+@cell_field_extractor("description_before_limit")
+def extract_cell_description(engine, record) -> str:
+    # The cell is the description: no need to guess where it ends
+    return clean_description(_cell(record, "Description")) or "-"
+
+
+@cell_field_extractor("documentation_refs")
+def extract_cell_documentation_refs(engine, record) -> List[str]:
+    return _documentation_refs(engine, _cell_or_record(record, "Documentation"))
+
+
+@cell_field_extractor("met_refs_joined")
+def extract_cell_met_refs_joined(engine, record) -> str:
+    return _met_refs_joined(engine, _cell_or_record(record, "Documentation"))
+
+
+@cell_field_extractor("first_met_ref")
+def extract_cell_first_met_ref(engine, record) -> str:
+    return _first_met_ref(engine, _cell_or_record(record, "Documentation"))
+
+
+@cell_field_extractor("limit")
+def extract_cell_limit(engine, record) -> Limit:
+    return parse_limit(_cell_or_record(record, "Limit"))
+
+
+@cell_field_extractor("mpn_pn_pairs")
+def extract_cell_mpn_pn(engine, record) -> List[tuple]:
+    if "MP/N" not in record:
+        return _mpn_pn_pairs(engine, _record_text(record))
+    if patterns.ALL_MPN.search(_cell(record, "MP/N")):
+        return [("ALL MP/N", "-")]
+
+    # One MP/N per line of the cell, its PN on the same line of the PN column
+    pns = dict(record.get("PN", ()))
+    pairs = {}
+    for line_number, text in record["MP/N"]:
+        match = patterns.MPN_WITH_PN.search(text)
+        if match:
+            mpn, pn = match.group(1).strip(), match.group(2).strip()
+            mpn = _resolve_mpn(engine, mpn)
+        else:
+            # The whole line is the part number: take the longest pattern match
+            found = engine.mpn_matcher.find_all(text)
+            mpn = engine.known_mpns.resolve(max(found, key=len) if found else text.strip())
+            pn = pns.get(line_number, "-").strip() or "-"
+        pairs.setdefault(mpn, pn)
+    return list(pairs.items()) or [("-", "-")]
+
+
+class _TaskValues(dict):
+    # Field values of one task, each computed on first use by the matching
+    # extractor from ``extractors``
+    def __init__(self, engine: "ExtractionEngine", extractors: Dict[str, Callable], *source):
+        super().__init__()
+        self.engine = engine
+        self.extractors = extractors
+        self.source = source
+
+    def __missing__(self, name: str):
+        value = self[name] = self.extractors[name](self.engine, *self.source)
+        return value
+
+
+class ExtractionEngine:
+    def __init__(self, db, formats: Iterable[str] = tuple(FORMATS), known_mpns: MPNCatalog = None,
+                 mpn_max_distance: int = 0):
+        self.db = db
+        self.formats = list(formats)
+        unknown = [name for name in self.formats if name not in FORMATS]
+        if unknown:
+            raise ValueError(f"Unknown format(s): {', '.join(unknown)}")
+        self.schemas = [FORMATS[name] for name in self.formats]
+
+        # Matched MET / CMM references, shared with every other engine in the process
+        self.known_refs = shared_registry(db)
+
+        self.known_mpns = None
+        if any(schema.fields & MPN_FIELDS for schema in self.schemas):
+            self.mpn_matcher = MPNMatcher(MPN_PATTERNS)
+            self.known_mpns = known_mpns if known_mpns is not None else load_catalog(db, max_distance=mpn_max_distance)
+
+    def save_refs(self):
+        self.known_refs.save(self.db)
+
+    def columns(self, name: str) -> List[str]:
+        return FORMATS[name].columns
+
+    def worker_args(self) -> Dict[str, Any]:
+        # Lets parallel workers rebuild this engine with the same formats and catalog
+        return {"formats": self.formats, "known_mpns": self.known_mpns}
+
+    def cache_state(self) -> str:
+        # Cached results are only valid for the catalog they were resolved against
+        return self.known_mpns.fingerprint() if self.known_mpns is not None else ""
+
+    def task_values(self, text: str) -> Iterator[Dict[str, Any]]:
+        """Lazily filled field values for each task line of one page of text."""
+        for span in task_spans(text):
+            yield _TaskValues(self, FIELD_EXTRACTORS, span)
+
+    def _rows(self, task_values: Iterable[Dict[str, Any]]) -> Dict[str, List[tuple]]:
+        rows = {name: [] for name in self.formats}
+        for values in task_values:
+            for schema in self.schemas:
+                rows[schema.name].extend(schema.rows(values))
+        return rows
+
+    def extract_page_rows(self, text: str) -> Dict[str, List[tuple]]:
+        """Rows of every requested format for one page of text."""
+        return self._rows(self.task_values(text))
+
+    def extract_record_rows(self, records: List[Dict[str, list]]) -> Dict[str, List[tuple]]:
+        """Rows of every requested format for the task records of one page (see word_columns)."""
+        return self._rows(_TaskValues(self, CELL_FIELD_EXTRACTORS, record) for record in records)
+
+    def iter_pages(self, pdf_path: str, workers: int = 1,
+                   backend: str = DEFAULT_BACKEND) -> Iterator[Tuple[int, Dict[str, List[tuple]]]]:
+        # Yields (page_number, {format: rows}) for every page, in page order
+        for page_number, rows in page_pipeline.iter_pages(self, pdf_path, workers, backend=backend):
+            # Pages without a task number come back from the pipeline as []
+            yield page_number, rows or {name: [] for name in self.formats}
+
+    def extract_dataframes(self, pdf_path: str, workers: int = 1, use_cache: bool = True,
+                           backend: str = DEFAULT_BACKEND) -> Dict[str, pd.DataFrame]:
+        """{format: DataFrame} for the whole PDF, from the result cache where possible."""
+        base_key = result_cache.cache_key(pdf_path, self, backend)
+        keys = {name: f"{base_key}-{name}" for name in self.formats}
+        if use_cache:
+            cached = {name: result_cache.load(key) for name, key in keys.items()}
+            if all(df is not None for df in cached.values()):
+                return cached
+
+        builders = {name: FrameBuilder(self.columns(name)) for name in self.formats}
+        for _, page_rows in self.iter_pages(pdf_path, workers, backend):
+            for name, format_rows in page_rows.items():
+                builders[name].extend(format_rows)
+        frames = {}
+        for name in self.formats:
+            frames[name] = builders[name].build()
+            result_cache.store(keys[name], frames[name])
+        return frames
+
+
+def _compare(pdf_path: str):
+    import time
+
+    from format_processor import PDFProcessor
+    from text_backends import get_backend
+
+    texts = [text for _, text in get_backend("pypdf2").iter_texts(pdf_path)]
+    engine = ExtractionEngine(None)
+
+    start = time.perf_counter()
+    separate = {}
+    for name in FORMATS:
+        processor = PDFProcessor(None, name, known_mpns=engine.known_mpns)
+        separate[name] = [row for text in texts if text for row in processor.extract_page_rows(text)]
+    separate_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    combined = {name: [] for name in FORMATS}
+    for text in texts:
+        if text:
+            for name, rows in engine.extract_page_rows(text).items():
+                combined[name].extend(rows)
+    combined_time = time.perf_counter() - start
+
+    assert combined == separate
+    print(f"{len(texts)} pages, rows: " + ", ".join(f"{name} {len(rows)}" for name, rows in combined.items()))
+    print(f"four converters:  {separate_time:.2f}s")
+    print(f"one engine pass:  {combined_time:.2f}s")
+    print(f"speedup:          {separate_time / combined_time:.2f}x")
+
+    # Task contexts as they used to be joined, line by line, against the spans
+    start = time.perf_counter()
+    joined = [" ".join(lines[i:i + 3]) for text in texts if text for lines in [text.split('\n')]
+              for i, line in enumerate(lines) if patterns.TASK_NUMBER.search(line)]
+    join_time = time.perf_counter() - start
+    start = time.perf_counter()
+    spans = [span for text in texts if text for span in task_spans(text)]
+    span_time = time.perf_counter() - start
+    assert [span.context for span in spans] == joined
+    print(f"task contexts:    split and join {join_time * 1e3:.1f}ms, spans {span_time * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    # python extraction_engine.py <pdf>
+    import sys
+
+    _compare(sys.argv[1])
@@ -0,0 +1,106 @@
+"""
+Pick the converter (TDDM, TDDIM, TDMPLM, TDMPLMD) that fits a PDF from a
+few of its task-bearing pages, so a document isn't run through the wrong
+one first.
+
+Each format is recognised by which fields its schema reads (see
+extraction_engine.FORMATS): documentation references, a limit/interval,
+MP/N columns. The extractors behind those fields are run on the sampled
+task lines, and each format scores the share of lines that agree with it
+-- the field is found where the format has the column, missing where it
+doesn't. Only PyPDF2 text is used, so this takes a fraction of a second.
+
+Run this module on PDFs to see the scores and timing.
+"""
+from typing import Callable, Dict, List, Tuple
+
+from extraction_engine import FORMATS, ExtractionEngine
+from mpn_catalog import MPNCatalog
+from text_backends import get_backend
+
+# Task-bearing pages sampled, and how many pages (spread over the document,
+# past any front matter) may be read to find them
+SAMPLE_PAGES = 5
+MAX_SCAN_PAGES = 40
+
+# Used when nothing in the scanned pages looks like a task
+FALLBACK_FORMAT = "tddm"
+
+# signal: (fields that mean a format has the column, test on a task line's values)
+SIGNALS: Dict[str, Tuple[set, Callable]] = {
+    "documentation": ({"documentation_refs", "met_refs_joined", "first_met_ref"},
+                      lambda values: bool(values["documentation_refs"])),
+    "limit": ({"limit"}, lambda values: values["limit"].text != "-"),
+    "mpn": ({"mpn_pn_pairs"}, lambda values: values["mpn_pn_pairs"] != [("-", "-")]),
+}
+
+
+def format_signals(name: str) -> set:
+    fields = FORMATS[name].fields
+    return {signal for signal, (signal_fields, _) in SIGNALS.items() if fields & signal_fields}
+
+
+def sample_texts(pdf_path: str, sample_pages: int = SAMPLE_PAGES,
+                 max_scan_pages: int = MAX_SCAN_PAGES) -> List[str]:
+    """Text of the first task-bearing pages among an even spread, read with PyPDF2."""
+    backend = get_backend("pypdf2")
+    page_count = backend.page_count(pdf_path)
+    step = max(1, -(-page_count // max_scan_pages))
+    texts = []
+    engine = ExtractionEngine(None, [])
+    for _, text in backend.iter_selected_texts(pdf_path, range(0, page_count, step)):
+        if text and next(engine.task_values(text), None) is not None:
+            texts.append(text)
+            if len(texts) >= sample_pages:
+                break
+    return texts
+
+
+def hit_rates(texts: List[str]) -> Dict[str, float]:
+    """Share of task lines on which each signal's extractor finds something."""
+    # An empty catalog: only whether an MP/N is found matters here
+    engine = ExtractionEngine(None, list(FORMATS), known_mpns=MPNCatalog())
+    hits = dict.fromkeys(SIGNALS, 0)
+    lines = 0
+    for text in texts:
+        for values in engine.task_values(text):
+            lines += 1
+            for signal, (_, test) in SIGNALS.items():
+                hits[signal] += test(values)
+    return {signal: count / lines for signal, count in hits.items()} if lines else {}
+
+
+def score_formats(rates: Dict[str, float]) -> Dict[str, float]:
+    scores = {}
+    for name in FORMATS:
+        expected = format_signals(name)
+        agreement = [rate if signal in expected else 1 - rate for signal, rate in rates.items()]
+        scores[name] = sum(agreement) / len(agreement)
+    return scores
+
+
+def detect_format(pdf_path: str, sample_pages: int = SAMPLE_PAGES) -> Tuple[str, Dict[str, float]]:
+    """(best format, {format: score in [0, 1]}) for a PDF."""
+    try:
+        rates = hit_rates(sample_texts(pdf_path, sample_pages))
+    except Exception as e:
+        print(f"{pdf_path}: format detection error: {str(e)}")
+        rates = {}
+    if not rates:
+        return FALLBACK_FORMAT, {}
+    scores = score_formats(rates)
+    # Ties go to the format listed first in FORMATS
+    return max(scores, key=scores.get), scores
+
+
+if __name__ == "__main__":
+    # python format_detector.py <pdf> [<pdf> ...]
+    import sys
+    import time
+
+    for path in sys.argv[1:]:
+        start = time.perf_counter()
+        name, scores = detect_format(path)
+        elapsed = time.perf_counter() - start
+        print(f"{path}: {name} in {elapsed * 1e3:.0f} ms  "
+              + "  ".join(f"{fmt} {score:.2f}" for fmt, score in scores.items()))
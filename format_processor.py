@@ -0,0 +1,100 @@
+"""
+PDFProcessor: extraction of one output format (TDDM, TDDIM, TDMPLM or
+TDMPLMD) from a PDF.
+
+The fields, columns and rows of each format come from its schema in
+extraction_engine.FORMATS; a processor is a single-format
+ExtractionEngine plus the caching and storage around it. Kept apart from
+the Tk apps (tddm.py, tddim.py, tdmplm.py, tdmplmd.py) so it can be used
+headless (see batch_cli.py).
+"""
+from typing import List, Dict, Tuple, Any, Iterator
+
+import pandas as pd
+
+from db_handler import Database
+import document_store
+from mpn_catalog import MPNCatalog
+from extraction_engine import ExtractionEngine
+import page_pipeline
+import result_cache
+import revisions
+import timings
+from frame_builder import build_frame
+from text_backends import DEFAULT_BACKEND
+
+
+class PDFProcessor:
+    def __init__(self, db: Database, format_name: str, known_mpns: MPNCatalog = None, mpn_max_distance: int = 0):
+        self.db = db
+        self.format_name = format_name
+        self.engine = ExtractionEngine(db, [format_name], known_mpns, mpn_max_distance)
+        self.columns = self.engine.columns(format_name)
+
+        # Known good values for pattern matching; None for formats without MP/Ns
+        self.known_mpns = self.engine.known_mpns
+
+        # Where the rows of the last PDF processed are stored (see save_edit)
+        self.doc_id = None
+
+    def worker_args(self) -> Dict[str, Any]:
+        # Lets parallel workers rebuild this processor with the same format and catalog
+        return {"format_name": self.format_name, "known_mpns": self.known_mpns}
+
+    def cache_state(self) -> str:
+        # Cached results are only valid for the catalog they were resolved against
+        return self.engine.cache_state()
+
+    def extract_page_rows(self, text: str) -> List[tuple]:
+        return self.engine.extract_page_rows(text)[self.format_name]
+
+    def extract_record_rows(self, records: List[Dict[str, list]]) -> List[tuple]:
+        return self.engine.extract_record_rows(records)[self.format_name]
+
+    def iter_pages(self, pdf_path: str, workers: int = 1,
+                   backend: str = DEFAULT_BACKEND) -> Iterator[Tuple[int, List[tuple]]]:
+        # Yields (page_number, rows) for every page, in page order
+        return page_pipeline.iter_pages(self, pdf_path, workers, backend=backend)
+
+    def iter_rows(self, pdf_path: str, workers: int = 1, backend: str = DEFAULT_BACKEND) -> Iterator[tuple]:
+        for _, rows in self.iter_pages(pdf_path, workers, backend):
+            yield from rows
+
+    def extract_dataframe(self, pdf_path: str, workers: int = 1, use_cache: bool = True,
+                          backend: str = DEFAULT_BACKEND) -> pd.DataFrame:
+        # Unchanged PDF + unchanged extraction rules -> stored result
+        cache_key = result_cache.cache_key(pdf_path, self, backend)
+        df = result_cache.load(cache_key) if use_cache else None
+        if df is None:
+            # Create DataFrame
+            df = build_frame(self.iter_rows(pdf_path, workers, backend), self.columns)
+            result_cache.store(cache_key, df)
+        return df
+
+    def process_pdf(self, pdf_path: str, workers: int = 1, use_cache: bool = True,
+                    backend: str = DEFAULT_BACKEND) -> pd.DataFrame:
+        with timings.run(pdf_path):
+            # Rows stored for this PDF under the same rules are read back
+            # rather than extracted again; new ones are saved
+            df, self.doc_id = document_store.load_or_extract(self, self.db, pdf_path, workers, use_cache, backend)
+            timings.count("rows", len(df))
+            self.engine.save_refs()
+        return df
+
+    def process_revision(self, pdf_path: str, workers: int = 1,
+                         backend: str = DEFAULT_BACKEND) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        # Like process_pdf, but only pages changed since the previous revision
+        # are extracted; also returns the changed tasks (see revisions.py)
+        with timings.run(pdf_path):
+            with timings.stage("extract"):
+                df, changes = revisions.extract_revision(self, self.db, pdf_path, workers, backend)
+            timings.count("rows", len(df))
+            self.doc_id = document_store.save_document(self, self.db, pdf_path, df, backend, source="revision")
+            self.engine.save_refs()
+        return df, changes
+
+    def save_edit(self, row_index: int, column: str, value) -> bool:
+        """Store an edited cell of the last processed PDF's rows, in place."""
+        if self.db is None or self.doc_id is None:
+            return False
+        return self.db.update_document_cell(self.doc_id, row_index, column, value)
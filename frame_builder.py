@@ -0,0 +1,190 @@
+"""
+Builds extraction results column by column instead of as a list of row
+tuples turned into an all-object DataFrame.
+
+Each distinct value of a column is held once, numbered in order of first
+appearance, and rows carry an int32 code into those values. Rows of one
+task line share their value objects (task number, description,
+Reference are repeated for each MP/N pair or documentation item of the
+line), so a repeat is recognised by identity without hashing the string
+again. At build time the short-list columns (CATEGORICAL_COLUMNS: Margin
+is always "0", ATA, Limit/Interval and Documentation come from a handful
+of values) become categoricals; the numeric limit/interval columns
+(INTEGER_COLUMNS) become nullable integers; free text -- task number,
+description, MP/N, PN, Reference -- stays an object column whose rows
+point at the shared strings.
+
+Missing values (None) come out as NaN/<NA>; display_frame turns them into
+"" for the preview and exports.
+
+Building the frame hands each column's codes back as soon as the column is
+built and doesn't copy the columns into one block, so its peak is close to
+the result's size. Run this module on a PDF for a tracemalloc comparison
+with the list-of-tuples DataFrame.
+"""
+from array import array
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from limits import DERIVED_COLUMNS, LIMIT_COLUMNS, limit_cells
+
+_UNSET = object()
+
+# Built as pandas' nullable Int64 rather than categorical, for sorting and
+# comparisons (df[df["Limit Months"] <= 12])
+INTEGER_COLUMNS = {"Limit Months", "Limit FH", "Interval Months", "Interval FH"}
+
+# Columns with few distinct values, built as categoricals; any other
+# column is free text and built with dtype object
+CATEGORICAL_COLUMNS = {"ATA", "Margin", "Limit", "Interval", "Documentation", "Type of LIR"}
+
+
+class FrameBuilder:
+    def __init__(self, columns: List[str]):
+        self.columns = list(columns)
+        self._codes = [array("i") for _ in self.columns]
+        # Per column: value -> code, codes numbered in order of first appearance
+        self._categories = [{} for _ in self.columns]
+        # Per column: (last value object, its code)
+        self._last = [(_UNSET, -1)] * len(self.columns)
+
+    def __len__(self) -> int:
+        return len(self._codes[0]) if self._codes else 0
+
+    def add(self, row: tuple):
+        last = self._last
+        for i, value in enumerate(row):
+            last_value, code = last[i]
+            if value is not last_value:
+                if value is None:
+                    code = -1
+                else:
+                    categories = self._categories[i]
+                    code = categories.get(value)
+                    if code is None:
+                        code = categories[value] = len(categories)
+                last[i] = (value, code)
+            self._codes[i].append(code)
+
+    def extend(self, rows: Iterable[tuple]):
+        for row in rows:
+            self.add(row)
+
+    def build(self) -> pd.DataFrame:
+        """The rows added so far as a DataFrame; empties the builder."""
+        data = {}
+        for i, name in enumerate(self.columns):
+            codes, categories = self._codes[i], self._categories[i]
+            self._codes[i], self._categories[i] = array("i"), {}
+            codes = np.frombuffer(codes, dtype=np.int32) if codes else np.empty(0, dtype=np.int32)
+            if name in INTEGER_COLUMNS:
+                # Code -1 (None) picks the trailing 0, masked out
+                values = np.array(list(categories) + [0], dtype=np.int64)
+                data[name] = pd.arrays.IntegerArray(values[codes], codes == -1)
+            elif name in CATEGORICAL_COLUMNS:
+                data[name] = pd.Categorical.from_codes(codes, categories=list(categories))
+            else:
+                # Code -1 (None) picks the trailing None
+                values = np.empty(len(categories) + 1, dtype=object)
+                values[:-1] = list(categories)
+                data[name] = pd.Series(values[codes], dtype=object, copy=False)
+        self._last = [(_UNSET, -1)] * len(self.columns)
+        # Not copied into one block of object columns
+        return pd.DataFrame(data, columns=self.columns, copy=False)
+
+
+def build_frame(rows: Iterable[tuple], columns: List[str]) -> pd.DataFrame:
+    builder = FrameBuilder(columns)
+    builder.extend(rows)
+    return builder.build()
+
+
+def display_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """``df`` with missing values as "", for the preview and exports (which would show "nan" or "<NA>")."""
+    return df.astype(object).where(df.notna(), "")
+
+
+def set_cell(df: pd.DataFrame, row: int, column: str, value):
+    """
+    Set one value of a built frame in place, e.g. an edited table cell. A
+    Limit/Interval is parsed again and its Months and FH columns set with
+    it; those can't be set on their own (see limits).
+    """
+    if column in DERIVED_COLUMNS:
+        raise ValueError(f"{column} is read from the limit's text, not set on its own")
+    cells = limit_cells(column, value) if column in LIMIT_COLUMNS else {column: value}
+    for name, cell_value in cells.items():
+        if name in df.columns:
+            _set_value(df, row, name, cell_value)
+
+
+def _set_value(df: pd.DataFrame, row: int, column: str, value):
+    series = df[column]
+    if column in INTEGER_COLUMNS:
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            value = pd.NA
+    elif isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        df[column] = series.cat.add_categories([value])
+    df.iat[row, df.columns.get_loc(column)] = value
+
+
+def _measure(pdf_path: str):
+    import gc
+    import pickle
+    import tracemalloc
+
+    from extraction_engine import ExtractionEngine
+    from mpn_catalog import MPNCatalog
+    from text_backends import get_backend
+
+    texts = [text for _, text in get_backend("pypdf2").iter_texts(pdf_path) if text]
+    engine = ExtractionEngine(None, known_mpns=MPNCatalog())
+    # Page results arrive pickled from the worker processes; extracted up
+    # front so only building the frame is traced
+    pickled = {name: [] for name in engine.formats}
+    for text in texts:
+        for name, rows in engine.extract_page_rows(text).items():
+            pickled[name].append(pickle.dumps(rows))
+
+    def pages(name):
+        for page_rows in pickled[name]:
+            yield pickle.loads(page_rows)
+
+    def as_tuples(name):
+        rows = []
+        for page_rows in pages(name):
+            rows.extend(page_rows)
+        return pd.DataFrame(rows, columns=engine.columns(name))
+
+    def as_columns(name):
+        builder = FrameBuilder(engine.columns(name))
+        for page_rows in pages(name):
+            builder.extend(page_rows)
+        return builder.build()
+
+    print(f"{len(texts)} pages")
+    for name in engine.formats:
+        results = {}
+        for label, build in [("row tuples", as_tuples), ("columnar", as_columns)]:
+            gc.collect()
+            tracemalloc.start()
+            df = build(name)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[label] = df
+            print(f"{name:>8} {label:>10}: {len(df):>6} rows, peak {peak / 1e6:6.1f}MB, "
+                  f"result {current / 1e6:6.1f}MB")
+        before, after = results["row tuples"], results["columnar"]
+        assert before.astype(object).where(before.notna(), None).values.tolist() == \
+            after.astype(object).where(after.notna(), None).values.tolist()
+
+
+if __name__ == "__main__":
+    # python frame_builder.py <pdf>
+    import sys
+
+    _measure(sys.argv[1])
@@ -0,0 +1,59 @@
+"""
+Limits and intervals: the text a row shows ("100 FH, 200 FH") and the
+numbers read from it.
+
+A row's Limit (or Interval) column holds the text, and its Months and FH
+columns the smallest value -- the one due first -- in that unit, which is
+what range queries and the limit indexes go by (see
+Database.get_tasks_within). The numbers are only ever parsed from the
+text: an edited limit is parsed again (limit_cells) and its numbers set
+with it, and the numeric columns aren't edited on their own.
+"""
+from typing import Any, Dict, NamedTuple, Optional
+
+import patterns
+
+
+class Limit(NamedTuple):
+    """
+    A limit/interval as shown ("100 FH, 200 FH"), and as numbers: its
+    smallest value -- the one due first -- in months or in flight hours.
+    """
+    text: str
+    months: Optional[int] = None
+    flight_hours: Optional[int] = None
+
+
+NO_LIMIT = Limit("-")
+
+# Text column -> its (months, flight hours) columns
+LIMIT_COLUMNS = {
+    "Limit": ("Limit Months", "Limit FH"),
+    "Interval": ("Interval Months", "Interval FH"),
+}
+
+# Columns read from a limit's text rather than edited
+DERIVED_COLUMNS = {column for columns in LIMIT_COLUMNS.values() for column in columns}
+
+
+def parse_limit(text: str, start: int = 0, end: int = None) -> Limit:
+    """The first limit in text[start:end]; NO_LIMIT if there is none."""
+    end = len(text) if end is None else end
+    for pattern, unit in patterns.LIMIT_PATTERNS:
+        match = pattern.search(text, start, end)
+        if match:
+            values = match.groups()
+            shown = ", ".join(f"{value} {unit}" for value in values)
+            due_first = min(int(value) for value in values)
+            return Limit(shown, months=due_first) if unit == "M" else Limit(shown, flight_hours=due_first)
+    return NO_LIMIT
+
+
+def limit_cells(column: str, text: str) -> Dict[str, Any]:
+    """
+    The cells an edit of a Limit/Interval column sets: the limit parsed
+    from ``text`` -- shown the way extraction shows it -- and its numbers.
+    """
+    months_column, flight_hours_column = LIMIT_COLUMNS[column]
+    limit = parse_limit(text or "")
+    return {column: limit.text, months_column: limit.months, flight_hours_column: limit.flight_hours}
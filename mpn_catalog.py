@@ -0,0 +1,344 @@
+"""
+Catalog of known MP/Ns used to snap extracted part numbers onto their
+canonical spelling.
+
+Two MP/Ns are considered the same part when they are equal after removing
+whitespace and trailing zeros from each hyphen-separated segment (see
+``canonical_mpn``). MPNCatalog keeps a dict from that canonical key to the
+catalog entry, so resolving a candidate is a single lookup however large
+the catalog grows.
+
+Besides the built-in KNOWN_MPNS, entries are read from
+``data/known_mpns.txt`` (one MP/N per line, ``#`` starts a comment) and
+from the ``known_mpns`` table of the application database.
+
+Optionally (``max_distance`` > 0) a candidate with no exact key match is
+snapped to the nearest catalog entry within that many inserted, dropped
+or changed characters, found through a BK-tree so that lookups stay
+sub-linear in the catalog size. Run this module directly for a benchmark
+against a linear scan at 50k entries.
+"""
+import hashlib
+import os
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import patterns
+from ensure_directories import ensure_app_directories
+
+CATALOG_FILE_NAME = "known_mpns.txt"
+
+# Candidates shorter than this are never fuzzy-matched: one edit away from
+# a short MP/N such as "1214" is almost any other four-digit number.
+MIN_FUZZY_LENGTH = 6
+
+# Known good values for pattern matching
+KNOWN_MPNS = [
+    "BL16600-12",
+    "355A1 2-003 1-01",
+    "355A12-51 03-00",
+    "350A33-1 526-00",
+    "355A11-0020-01 ",
+    "350A33-1 535-00 ",
+    "350A75-1027-20",
+    "2928-2",
+    "LS210PS30",
+    "FINLONTYPEFO",
+    "Y51BB10843S1M73",
+    "INA36132A",
+    "LS210PS30", # HS 3 JD 2
+    "60081491 E",#8 E
+    "60081492E",#8E
+    "350A31-3020-20",#3 A 2- 4- 2
+    "350A33-2Q04-05", # 3 A 2 -1D 2 -2
+    "704A33-633-091", # 3 A 2- 3- 3
+    "81 0-41 8A",#3-3D
+    "563-073",# 3-3
+    "579045",#6
+    "158171A",# 6F
+    "158210-1",#6- 1
+    "709628-100 ",# 6-3
+    "56995-0101",# 5-4
+    "3205562",#7
+    "451400003",#9
+    "LB4-1231-1",# LF1 - 4- 1
+    "LB6-1231-3-1 ",# LF1 - 4- 1- 1
+    "1606-1",# 4 -1
+    "78825",#5
+    "17149-1",#5-1
+    "1214",#4
+    "P94B12-207", # D2B2 -3
+    "SL846-XOL", #VH -DEE
+    "EE0033", # DD4
+    "EE0033A",# DD4A
+    "20CF4D ",# 2DF 4 D
+    "Y-1265-1 2-1 ",# H - 4 -2 -1
+    "JE2-1 978-3", #FF 1 -4 -1
+    "JE2-1978-3NG", # DD1 -4 -1GH
+    "ELT90A2560 102001", #DFD 2 V 10
+]
+
+
+def canonical_mpn(mpn: str) -> str:
+    """Whitespace removed, trailing zeros stripped from each '-' segment."""
+    mpn = patterns.WHITESPACE.sub('', mpn)
+    return "-".join(part.rstrip('0') for part in mpn.split('-'))
+
+
+def distance_from(a: str) -> Callable[[str], int]:
+    """
+    Levenshtein distance to ``a`` as a function of the other string.
+
+    Bit-parallel (Myers/Hyyro): ``a`` is encoded once as one bitmask per
+    character and each character of the other string is then a handful of
+    integer operations, instead of a row of the dynamic-programming table.
+    """
+    m = len(a)
+    if m == 0:
+        return len
+    peq = {}
+    for i, char in enumerate(a):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+
+    def distance(b: str) -> int:
+        pv, mv, score = mask, 0, m
+        for char in b:
+            eq = peq.get(char, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | ~(xh | pv)
+            mh = pv & xh
+            if ph & high:
+                score += 1
+            elif mh & high:
+                score -= 1
+            ph = (ph << 1) | 1
+            mh <<= 1
+            pv = (mh | ~(xv | ph)) & mask
+            mv = ph & xv & mask
+        return score
+
+    return distance
+
+
+def edit_distance(a: str, b: str) -> int:
+    return distance_from(a)(b)
+
+
+class BKTree:
+    """
+    Metric index over strings under edit distance. A query only descends
+    into children whose edge distance is within ``max_distance`` of the
+    query's distance to the node (triangle inequality), so most of the
+    tree is never visited.
+    """
+
+    def __init__(self):
+        # node = [key, insertion order, {distance: child node}]
+        self._root = None
+        self._size = 0
+
+    def add(self, key: str):
+        node = [key, self._size, {}]
+        self._size += 1
+        if self._root is None:
+            self._root = node
+            return
+        parent = self._root
+        distance_to = distance_from(key)
+        while True:
+            distance = distance_to(parent[0])
+            if distance == 0:
+                return
+            child = parent[2].get(distance)
+            if child is None:
+                parent[2][distance] = node
+                return
+            parent = child
+
+    def search(self, key: str, max_distance: int) -> List[Tuple[int, int, str]]:
+        """(distance, insertion order, key) of every entry within max_distance."""
+        found = []
+        if self._root is None:
+            return found
+        distance_to = distance_from(key)
+        stack = [self._root]
+        while stack:
+            node_key, order, children = stack.pop()
+            distance = distance_to(node_key)
+            if distance <= max_distance:
+                found.append((distance, order, node_key))
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return found
+
+    def nearest(self, key: str, max_distance: int) -> Optional[str]:
+        """Closest key within max_distance, earliest added on a tie."""
+        found = self.search(key, max_distance)
+        return min(found)[2] if found else None
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class MPNCatalog:
+    def __init__(self, mpns: Iterable[str] = (), max_distance: int = 0):
+        self.mpns = set()
+        self.max_distance = max_distance
+        self._index = {}
+        self._tree = None
+        self.update(mpns)
+
+    def add(self, mpn: str):
+        self.mpns.add(mpn)
+        # The first entry loaded for a key wins, as the catalog's spelling
+        key = canonical_mpn(mpn)
+        if key not in self._index:
+            self._index[key] = mpn
+            if self._tree is not None:
+                self._tree.add(key)
+
+    def update(self, mpns: Iterable[str]):
+        for mpn in mpns:
+            self.add(mpn)
+
+    def resolve(self, mpn: str) -> str:
+        """The catalog spelling of ``mpn``, or ``mpn`` itself if unknown."""
+        if mpn in self.mpns:
+            return mpn
+        key = canonical_mpn(mpn)
+        known = self._index.get(key)
+        if known is not None:
+            return known
+        if self.max_distance > 0 and len(key) >= MIN_FUZZY_LENGTH:
+            nearest = self._nearest_key(key)
+            if nearest is not None:
+                return self._index[nearest]
+        return mpn
+
+    def _nearest_key(self, key: str) -> Optional[str]:
+        if self._tree is None:
+            # Built on first use; the catalog is usually loaded in bulk
+            self._tree = BKTree()
+            for known_key in self._index:
+                self._tree.add(known_key)
+        return self._tree.nearest(key, self.max_distance)
+
+    def fingerprint(self) -> str:
+        """Hash of everything resolve() depends on, for result_cache."""
+        digest = hashlib.sha256(f"{self.max_distance}\n".encode("utf-8"))
+        for mpn in sorted(self.mpns):
+            digest.update(f"{mpn}\n".encode("utf-8"))
+        # Index order matters: the first entry loaded for a key wins
+        for key, mpn in self._index.items():
+            digest.update(f"{key}\t{mpn}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def __getstate__(self):
+        # Worker processes rebuild the tree on demand rather than unpickle it
+        state = self.__dict__.copy()
+        state["_tree"] = None
+        return state
+
+    def __contains__(self, mpn: str) -> bool:
+        return mpn in self.mpns
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.mpns)
+
+    def __len__(self) -> int:
+        return len(self.mpns)
+
+
+def read_catalog_file(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            mpn = line.split('#', 1)[0].strip()
+            if mpn:
+                yield mpn
+
+
+def load_catalog(db=None, path: str = None, max_distance: int = 0) -> MPNCatalog:
+    """
+    Built-in MP/Ns, then the catalog file (data/known_mpns.txt unless
+    ``path`` is given) if it exists, then the database's known_mpns table.
+    """
+    catalog = MPNCatalog(KNOWN_MPNS, max_distance=max_distance)
+
+    if path is None:
+        data_dir, _ = ensure_app_directories()
+        path = os.path.join(data_dir, CATALOG_FILE_NAME)
+    if os.path.exists(path):
+        try:
+            catalog.update(read_catalog_file(path))
+        except Exception as e:
+            print(f"Error reading MP/N catalog {path}: {str(e)}")
+
+    if db is not None:
+        catalog.update(db.get_known_mpns())
+
+    return catalog
+
+
+def _benchmark(size: int = 50000, queries: int = 50, max_distance: int = 1):
+    import random
+    import string
+    import time
+
+    rng = random.Random(0)
+
+    # Catalogs come in families: one drawing prefix with many dash numbers,
+    # e.g. 355A12-0051-03, 355A12-0051-04, 355A12-0060-01
+    prefixes = ["".join(rng.choice(string.digits) for _ in range(3)) +
+                rng.choice(string.ascii_uppercase) +
+                "".join(rng.choice(string.digits) for _ in range(2))
+                for _ in range(size // 100)]
+
+    def random_mpn():
+        return (f"{rng.choice(prefixes)}-{rng.randrange(10000):04d}"
+                f"-{rng.randrange(100):02d}")
+
+    def damage(mpn):
+        i = rng.randrange(len(mpn))
+        op = rng.choice(["drop", "insert", "swap"])
+        if op == "drop":
+            return mpn[:i] + mpn[i + 1:]
+        if op == "insert":
+            return mpn[:i] + rng.choice(string.digits) + mpn[i:]
+        return mpn[:i] + rng.choice(string.digits) + mpn[i + 1:]
+
+    entries = [random_mpn() for _ in range(size)]
+    start = time.perf_counter()
+    catalog = MPNCatalog(entries, max_distance=max_distance)
+    catalog._nearest_key(canonical_mpn(entries[0]))  # builds the tree
+    build = time.perf_counter() - start
+
+    probes = [damage(rng.choice(entries)) for _ in range(queries)]
+    keys = list(catalog._index)
+
+    start = time.perf_counter()
+    tree_hits = [catalog._nearest_key(canonical_mpn(p)) for p in probes]
+    tree_time = (time.perf_counter() - start) / queries
+
+    start = time.perf_counter()
+    linear_hits = []
+    for probe in probes:
+        probe_key = canonical_mpn(probe)
+        distance_to = distance_from(probe_key)
+        found = [(distance_to(key), order, key) for order, key in enumerate(keys)
+                 if abs(len(key) - len(probe_key)) <= max_distance]
+        found = [hit for hit in found if hit[0] <= max_distance]
+        linear_hits.append(min(found)[2] if found else None)
+    linear_time = (time.perf_counter() - start) / queries
+
+    assert tree_hits == linear_hits
+    print(f"{len(keys)} catalog keys, max distance {max_distance}, tree built in {build:.2f}s")
+    print(f"linear scan: {linear_time * 1e3:8.2f} ms/query")
+    print(f"BK-tree:     {tree_time * 1e3:8.2f} ms/query")
+    print(f"speedup:     {linear_time / tree_time:8.2f}x")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,241 @@
+"""
+MP/N (manufacturer part number) recognition for the part-number layouts
+(TDMPLM, TDMPLMD).
+
+MPN_PATTERNS lists the known MP/N shapes in priority order. Instead of
+running every pattern over the context one after another, MPNMatcher folds
+them into a single regex that visits the text once: at each word start one
+named lookahead per pattern records which shapes match there, so
+overlapping hits from different patterns (e.g. "158210" and "158210-1")
+are still found, exactly as the sequential loop found them.
+
+tests/test_mpn_matcher.py checks output parity against the sequential
+loop (kept here as _sequential) on a corpus of part-number-dense lines.
+Run this module on a PDF to time both on its pages and task contexts;
+the gain depends on the text -- small on pages dense with part numbers,
+where every word start is a candidate for many patterns.
+"""
+import re
+from typing import List, Optional, Tuple
+
+import patterns
+
+
+def _keep(text: str) -> str:
+    return text
+
+
+def _collapse(text: str) -> str:
+    return patterns.WHITESPACE.sub('', text)
+
+
+# (pattern, formatter) in priority order. A formatter is either a function
+# of the matched text or a fixed replacement string.
+MPN_PATTERNS = [
+    (r'\b\d{5}-\d{1}\b', _keep), #17149-1
+    (r'\b[A-Z]{2}\d{5}\s*-\s*\d{2}\b', _collapse), #BL16600-12
+    (r'\b\d{3}[A-Z]\d{2}\s*-\s*\d{2}-\d{2}\s*-\s*\b}', _keep), # 355A12-51 03-00
+    (r'\b\d{4}-\d{1}\b', _keep), #2928-2
+    (r'\b[A-Z]{2}\d{3}[A-Z]{2}\d{3}\b', _keep), # LS210PS30
+    (r'\b[A-Z]{11}\b', _keep), # FINLONTYPEFO
+    (r'\bALL\s+MP/N\b', 'ALL MP/N'),  # ALL MP/N
+    (r'\b\d{6}\s*[A-Z]\b', _collapse),  # 60081492E, 60081491 E
+    (r'\b\d{6}\b', _keep),  # 579045
+    (r'\b\d{4}\s*-\s*\d{1}\b', _collapse),  # 1606-1
+    (r'\b\d{6}-\d{1}\b', _collapse),  # 158210-1
+    (r'\b\d{3}[A-Z]\d{2}\s*-\s*\d{1,3}\s*-\s*\d{2}\b', _collapse),
+    (r'\b\d{3}[A-Z]\d{2}\s*-\s*\d{4}\s*-\s*\d{2}\b', _collapse),  # 350A31-3020-20
+    (r'\b\d{3}[A-Z]\d{2}\s*-\s*\d{1}[A-Z]\d{2}\s*-\s*\d{2}\b', _collapse),  # 350A33-2Q04-05
+    (r'\b\d{3}[A-Z]\d{2}\s*-\s*\d{4}\s*-\s*\d{1,2}\b', _collapse),  # 355A11-0020-01
+    (r'\b\d{3}[A-Z]{1}\d{2}\s*-\s*\d{4}\s*-\s*\d{2}\b', _collapse), # 350A75-1027-20
+    (r'\b[A-Z]{2}\d{1,2}-\d{4}-\d{1,2}\b', _keep),  # LB4-1231-1
+    (r'\b[A-Z]{2}\d{1,2}-\d{4}-\d{1,2}\s*-\s*\d{1,2}\b', _keep),  # LB6-1231-3-1
+    (r'\b[A-Z]{2}\d{1}\s*-\s*\d{4}\s*-\s*\d{1}\b' , _collapse),
+    (r'\b[A-Z]{2}\d{3}[A-Z]{2}\d{2}\b', _collapse), # LS210PS30
+    (r'\b[A-Z]{1}\d{2}[A-Z]{2}\d{5}[A-Z]{1}\d{1}[A-Z]{1}\d{2}\b', _keep), # Y51BB10843S1M73
+    (r'\b[A-Z]{3}\d{5}[A-Z]{1}\b', _collapse), # INA36132A
+    (r'\b\d{3}[A-Z]{1}\d{2}\s*-\s*\d{1,4}\s*-\s*\d{2}\b', _collapse), # 350A33-1 535-00
+    (r'\b\d{3}[A-Z]{1}\d{2}\s*-\s*\d{1}\s*\d{3}\s*-\s*\d{2}\b', _collapse), # 350A33-1 526-00
+    (r'\b\d{3}[A-Z]\d{2}\s*-\s*\d{2}-\d{2}\s*-\s*\d{2}\b}', _keep), # 355A12-51 03-00
+    (r'\b\d{3}[A-Z]\d{2}\s*-\s*\d{2}\s*\d{2}\s*-\s*\b}', _keep), # 355A12-51 03-00
+    (r'\b\d{3}[A-Z]\d{1}\d{1}\s*-\s*\d{3} \d{1}-\d{2}\s*-\s*\d{2}\b}', _collapse), # 355A12-51 03-00
+    (r'\b\d{3}[A-Z]\d{2}\s*-\s*\d{1,3}\s* \s*\d{1}\s*-\s*\d{2}\b}', _keep) # 350A31-191 7-00
+]
+
+
+def _format(formatter, text: str) -> str:
+    return formatter(text) if callable(formatter) else formatter
+
+
+# A leading fixed-shape atom of an MP/N pattern: \d, [A-Z] (optionally with
+# a {n} or {n,m} count) or a literal capital letter.
+_ATOM = re.compile(r"(\\d|\[A-Z\])(?:\{(\d+)(?:,\d+)?\})?|([A-Z])")
+
+
+def _leading_atoms(pattern: str) -> List[Tuple[str, int, str]]:
+    """(char class, minimum count, source) for each leading atom after \\b."""
+    atoms = []
+    pos = len(r"\b")
+    while True:
+        match = _ATOM.match(pattern, pos)
+        if not match:
+            return atoms
+        if match.group(3):
+            atoms.append((match.group(3), 1, match.group(3)))
+        else:
+            atoms.append((match.group(1), int(match.group(2) or 1),
+                          match.group(0).replace("{1}", "")))
+        pos = match.end()
+
+
+def _common_guard(atom_lists: List[List[Tuple[str, int, str]]]) -> str:
+    """
+    Longest prefix every pattern of a family must start with: identical
+    atoms are kept as-is, and the first atom that differs only in count is
+    kept with the smallest count.
+    """
+    guard = ""
+    for column in zip(*atom_lists):
+        if all(atom[2] == column[0][2] for atom in column):
+            guard += column[0][2]
+            continue
+        if all(atom[0] == column[0][0] for atom in column):
+            count = min(atom[1] for atom in column)
+            guard += column[0][0] + (f"{{{count}}}" if count > 1 else "")
+        break
+    return guard
+
+
+class MPNMatcher:
+    """
+    All MP/N shapes of a pattern table compiled into one scanning regex.
+
+    Every MP/N pattern starts at a word boundary, so the scan only stops at
+    word starts. Patterns are grouped into families by their first atom
+    (e.g. "\\d{3}", "[A-Z]{2}"), and a family's lookaheads are only tried
+    when the shared prefix of its members matches, which rejects most words
+    after a single cheap check. The trailing chain of conditionals makes
+    the regex fail (and move on) wherever no pattern matched.
+    """
+
+    def __init__(self, mpn_patterns=MPN_PATTERNS):
+        self.formatters = [formatter for _, formatter in mpn_patterns]
+        names = [f"p{i}" for i in range(len(mpn_patterns))]
+
+        families = {}
+        for name, (pattern, _) in zip(names, mpn_patterns):
+            atoms = _leading_atoms(pattern)
+            key = (atoms[0][0], atoms[0][1]) if atoms else None
+            families.setdefault(key, []).append((name, pattern, atoms))
+
+        branches = {"digit": [], "letter": [], "other": []}
+        for key, members in families.items():
+            lookaheads = "".join(f"(?:(?=(?P<{name}>{pattern})))?"
+                                 for name, pattern, _ in members)
+            guard = _common_guard([atoms for _, _, atoms in members]) if key else ""
+            if guard:
+                lookaheads = f"(?:(?={guard}){lookaheads})?"
+            if key is None:
+                branch = "other"
+            elif key[0] == r"\d":
+                branch = "digit"
+            else:
+                branch = "letter"
+            branches[branch].append((lookaheads, [name for name, _, _ in members]))
+
+        def alternative(branch):
+            # The branch's lookaheads, then fail unless one of them matched
+            lookaheads = "".join(part for part, _ in branches[branch])
+            any_matched = "(?!)"
+            for _, group_names in reversed(branches[branch]):
+                for name in reversed(group_names):
+                    any_matched = f"(?({name})|{any_matched})"
+            return lookaheads + any_matched
+
+        combined = (r"\b(?:(?=\d)" + alternative("digit") +
+                    r"|(?=[A-Za-z])" + alternative("letter") +
+                    "|" + alternative("other") + ")")
+
+        # The standalone scan has always been case-insensitive, the match
+        # of a parenthesised MP/N case-sensitive.
+        self._scan = re.compile(combined, re.IGNORECASE)
+        self._anchored = re.compile(combined)
+
+        # Families reorder the lookaheads, so map each capture group (in
+        # regex order) back to its pattern's priority.
+        groups = sorted(self._scan.groupindex.items(), key=lambda item: item[1])
+        self._priority = [names.index(name) for name, _ in groups]
+
+    def match(self, mpn: str) -> Optional[str]:
+        """
+        Format ``mpn`` with the first pattern that matches at its start,
+        or return None if no pattern does.
+        """
+        match = self._anchored.match(mpn)
+        if not match:
+            return None
+        found = [(index, text) for index, text in zip(self._priority, match.groups())
+                 if text is not None]
+        index, text = min(found)
+        return _format(self.formatters[index], text)
+
+    def find_all(self, text: str) -> List[str]:
+        """
+        Formatted MP/Ns in ``text``: every match of the first pattern, then
+        every match of the second, and so on, each pattern's matches being
+        non-overlapping and left to right.
+        """
+        hits = [[] for _ in self.formatters]
+        ends = [0] * len(self.formatters)
+        for match in self._scan.finditer(text):
+            start = match.start()
+            for index, found in zip(self._priority, match.groups()):
+                if found is not None and start >= ends[index]:
+                    ends[index] = start + len(found)
+                    hits[index].append(_format(self.formatters[index], found))
+        return [mpn for pattern_hits in hits for mpn in pattern_hits]
+
+
+def _sequential(text: str) -> List[str]:
+    # The original loop: one finditer per pattern, in priority order
+    found = []
+    for pattern, formatter in MPN_PATTERNS:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            found.append(_format(formatter, match.group(0)))
+    return found
+
+
+def _sequential_match(mpn: str) -> Optional[str]:
+    for pattern, formatter in MPN_PATTERNS:
+        match = re.match(pattern, mpn)
+        if match:
+            return _format(formatter, match.group(0))
+    return None
+
+
+def _benchmark(pdf_path: str, repeat: int = 5):
+    import timeit
+
+    from extraction_engine import task_spans
+    from text_backends import get_backend
+
+    matcher = MPNMatcher()
+    pages = [text for _, text in get_backend("pypdf2").iter_texts(pdf_path) if text]
+    contexts = [span.context for text in pages for span in task_spans(text)]
+
+    def best(func):
+        return min(timeit.repeat(func, number=1, repeat=repeat))
+
+    for label, texts in (("pages", pages), ("task contexts", contexts)):
+        assert [matcher.find_all(text) for text in texts] == [_sequential(text) for text in texts]
+        before = best(lambda: [_sequential(text) for text in texts])
+        after = best(lambda: [matcher.find_all(text) for text in texts])
+        print(f"{len(texts)} {label}: sequential {before * 1e3:.1f} ms, "
+              f"combined {after * 1e3:.1f} ms, speedup {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    # python mpn_matcher.py <pdf>
+    import sys
+
+    _benchmark(sys.argv[1])
@@ -0,0 +1,173 @@
+"""
+Bounded memory while reading large PDFs with pdfplumber.
+
+pdfplumber keeps each page's parsed objects and layout for as long as the
+document is open -- about 1.7MB a page on the test manuals, 2.6GB after
+1,500 pages. Pages handed out by iter_plumber_pages are released as soon
+as the caller moves on to the next one: closed where pdfplumber has
+Page.close, their caches flushed on older releases without it.
+
+Bounded-memory mode goes further for very large documents: the PDF is
+reopened every ``chunk_pages`` pages, dropping the document-level caches
+pdfminer builds up, and the process's resident memory is checked after
+each page. Above the ceiling the document is reopened early; if that
+doesn't bring it back under, MemoryCeilingError stops the extraction
+instead of letting the machine swap.
+
+The settings live in the environment (see set_limits) so the worker
+processes of a pool pick them up however they are started.
+
+Run this module on a PDF to see resident memory against page count;
+tests/test_page_memory.py checks it stays flat on a generated PDF.
+"""
+import gc
+import os
+from typing import Iterable, Iterator, Optional, Tuple
+
+import pdfplumber
+
+import timings
+
+# Pages read between reopenings of the document in bounded-memory mode
+CHUNK_PAGES = 200
+
+MB = 1024 * 1024
+
+CHUNK_PAGES_ENV = "EXTRACT_CHUNK_PAGES"
+MAX_RSS_ENV = "EXTRACT_MAX_RSS_MB"
+
+
+class MemoryCeilingError(MemoryError):
+    pass
+
+
+def set_limits(chunk_pages: Optional[int] = None, max_rss_mb: Optional[int] = None):
+    """Turn bounded-memory mode on (or off, with no arguments) for this process and its workers."""
+    for name, value in [(CHUNK_PAGES_ENV, chunk_pages), (MAX_RSS_ENV, max_rss_mb)]:
+        if value:
+            os.environ[name] = str(value)
+        else:
+            os.environ.pop(name, None)
+
+
+def limits() -> Tuple[Optional[int], Optional[int]]:
+    """(pages per chunk, resident memory ceiling in bytes); None where unset."""
+    try:
+        chunk_pages = int(os.environ.get(CHUNK_PAGES_ENV, 0)) or None
+        max_rss_mb = int(os.environ.get(MAX_RSS_ENV, 0)) or None
+    except ValueError as e:
+        print(f"Memory limit setting error: {str(e)}")
+        return None, None
+    return chunk_pages, max_rss_mb and max_rss_mb * MB
+
+
+def rss_bytes() -> Optional[int]:
+    """Resident memory of this process, or None where it can't be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def _open(pdf_path: str):
+    with timings.stage("pdfplumber.open"):
+        return pdfplumber.open(pdf_path)
+
+
+def release_page(page):
+    """Drop what pdfplumber holds for a page the caller is done with."""
+    if hasattr(page, "close"):
+        page.close()
+        return
+    # pdfplumber releases before Page.close: clear the parsed objects and
+    # the cached text map by hand
+    page.flush_cache()
+    get_textmap = getattr(page, "get_textmap", None)
+    if hasattr(get_textmap, "cache_clear"):
+        get_textmap.cache_clear()
+
+
+def iter_plumber_pages(pdf_path: str, indices: Iterable[int]) -> Iterator:
+    """
+    pdfplumber pages at the given 0-based indices, each released once the
+    caller asks for the next, within the current memory limits. An index
+    past the last page ends the walk.
+    """
+    chunk_pages, max_rss = limits()
+    pdf = _open(pdf_path)
+    try:
+        read = 0
+        for index in indices:
+            if chunk_pages and read >= chunk_pages:
+                pdf.close()
+                pdf = _open(pdf_path)
+                read = 0
+            if index >= len(pdf.pages):
+                break
+            page = pdf.pages[index]
+            try:
+                yield page
+            finally:
+                release_page(page)
+            read += 1
+
+            if max_rss and (rss_bytes() or 0) > max_rss:
+                pdf.close()
+                gc.collect()
+                pdf = _open(pdf_path)
+                read = 0
+                rss = rss_bytes() or 0
+                if rss > max_rss:
+                    raise MemoryCeilingError(f"{rss // MB}MB resident after page {index + 1}, "
+                                             f"above the {max_rss // MB}MB ceiling")
+    finally:
+        pdf.close()
+
+
+def _rss_profile(pdf_path: str, mode: str) -> list:
+    # Resident memory (MB) after every tenth of the pages, read in one mode
+    if mode == "bounded":
+        set_limits(CHUNK_PAGES)
+    with pdfplumber.open(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+    marks = {max(1, page_count * tenth // 10) for tenth in range(1, 11)}
+    samples = []
+    if mode == "kept open":
+        # How every page was read before: the document open throughout
+        with pdfplumber.open(pdf_path) as pdf:
+            for number, page in enumerate(pdf.pages, 1):
+                page.extract_text()
+                if number in marks:
+                    samples.append((number, rss_bytes() / MB))
+        return samples
+    for number, page in enumerate(iter_plumber_pages(pdf_path, range(page_count)), 1):
+        page.extract_text()
+        if number in marks:
+            samples.append((number, rss_bytes() / MB))
+    return samples
+
+
+def _measure(pdf_path: str):
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+
+    for mode in ["kept open", "closed", "bounded"]:
+        # A fresh process per mode, so one doesn't inherit another's heap
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            start = time.perf_counter()
+            samples = executor.submit(_rss_profile, pdf_path, mode).result()
+            elapsed = time.perf_counter() - start
+        print(f"{mode:>9} ({elapsed:5.1f}s): " + "  ".join(f"{pages}p {rss:.0f}MB" for pages, rss in samples))
+
+
+if __name__ == "__main__":
+    # python page_memory.py <pdf>
+    import sys
+
+    _measure(sys.argv[1])
@@ -0,0 +1,302 @@
+"""
+Page walking shared by the format PDFProcessor and ExtractionEngine.
+
+Each converter knows how to turn the text of a single page into table rows
+(``extract_page_rows``); this module takes care of reading the PDF through
+a text backend (see text_backends) and feeding it pages, either serially
+or spread across a pool of worker processes. Results are produced as a stream of (page_number, rows) pairs
+in page order, so callers never need to hold the whole document.
+
+Page text is saved to the page text store the first time a document is
+read, so later runs -- with any converter -- don't read the PDF again.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import patterns
+import timings
+from page_text_store import PageTextStore
+from result_cache import file_hash
+from text_backends import AUTO, DEFAULT_BACKEND, WORDS, TextBackend, get_backend
+
+# Pages re-read with pdfplumber when choosing a backend automatically
+SAMPLE_PAGES = 5
+
+# Pages with less text than this (whitespace aside) are never pre-filtered
+# out: PyPDF2 may simply have failed to read them
+PRESCAN_MIN_CHARS = 20
+
+# Text _iter_extracted gives pages the pre-scan ruled out (never read)
+_SKIPPED = object()
+
+# Below this many pages the cost of starting worker processes outweighs the
+# gain, so parallel mode quietly falls back to the serial path.
+MIN_PARALLEL_PAGES = 20
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """
+    Split ``page_count`` pages into contiguous (start, stop) ranges.
+
+    A few ranges are handed to each worker so that a slow stretch of the
+    document doesn't leave the rest of the pool idle.
+    """
+    if page_count <= 0:
+        return []
+    chunks = max(1, min(page_count, workers * 4))
+    size, extra = divmod(page_count, chunks)
+    ranges = []
+    start = 0
+    for i in range(chunks):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def _page_rows(processor, text: Optional[str]) -> List[tuple]:
+    # Rows only ever start at a task number, so pages without one skip the
+    # converter's line loop
+    if not text or not patterns.TASK_NUMBER_ANYWHERE.search(text):
+        return []
+    with timings.stage("extract_rows"):
+        return processor.extract_page_rows(text)
+
+
+def prescan_pages(pdf_path: str) -> Tuple[Optional[List[int]], List[int]]:
+    """
+    0-based indices of the pages that may hold a task number, judged from
+    PyPDF2's text with whitespace removed (so a number split across text
+    runs still counts), and the length of that text for every page. Pages
+    with too little text to judge are kept. The indices are None when the
+    pre-scan can't be trusted for this document: PyPDF2 fails on it or
+    finds no task number anywhere.
+    """
+    try:
+        texts = [text for _, text in get_backend("pypdf2").iter_texts(pdf_path)]
+    except Exception as e:
+        print(f"Pre-scan error: {str(e)}")
+        return None, []
+    candidates = []
+    sizes = []
+    found = False
+    for index, text in enumerate(texts):
+        compact = patterns.WHITESPACE.sub("", text or "")
+        sizes.append(len(compact))
+        if patterns.TASK_NUMBER_COMPACT.search(compact):
+            candidates.append(index)
+            found = True
+        elif len(compact) < PRESCAN_MIN_CHARS:
+            candidates.append(index)
+    return (candidates if found else None), sizes
+
+
+def choose_backend(processor, pdf_path: str,
+                   sample_pages: int = SAMPLE_PAGES) -> Tuple[TextBackend, Optional[List[Optional[str]]]]:
+    """
+    Pick PyPDF2 if it gives ``processor`` the same rows as pdfplumber on a
+    sample of the pages that have rows at all. Returns the backend and, when
+    it is PyPDF2, the text already read so the document isn't read twice.
+    """
+    fast, reference = get_backend("pypdf2"), get_backend("pdfplumber")
+    try:
+        texts = [text for _, text in fast.iter_texts(pdf_path)]
+    except Exception as e:
+        print(f"PyPDF2 read error: {str(e)}")
+        return reference, None
+
+    productive = [index for index, text in enumerate(texts) if _page_rows(processor, text)]
+    if not productive:
+        return reference, None
+    step = max(1, len(productive) // sample_pages)
+    sample = productive[::step][:sample_pages]
+    for index, (_, text) in zip(sample, reference.iter_selected_texts(pdf_path, sample)):
+        if _page_rows(processor, text) != _page_rows(processor, texts[index]):
+            return reference, None
+    return fast, texts
+
+
+def iter_page_rows(processor, pdf_path: str, start: int = 0, stop: int = None,
+                   backend: str = DEFAULT_BACKEND) -> Iterator[Tuple[int, List[tuple]]]:
+    """Yield (page_number, rows) for pages [start, stop) of the PDF."""
+    for page_number, text in get_backend(backend).iter_texts(pdf_path, start, stop):
+        yield page_number, _page_rows(processor, text)
+
+
+def iter_selected_pages(processor, pdf_path: str, indices: List[int], workers: int = 1,
+                        backend: str = DEFAULT_BACKEND) -> Iterator[Tuple[int, List[tuple]]]:
+    """
+    (page_number, rows) for just the pages at the given 0-based indices, in
+    order, read from the PDF with a named backend or "words".
+    """
+    if backend == WORDS:
+        from word_columns import iter_selected_word_pages
+        return iter_selected_word_pages(processor, pdf_path, indices, workers)
+    return ((page_number, rows)
+            for page_number, _, rows in _iter_selected(processor, pdf_path, workers, backend, indices))
+
+
+def _extract_pages(processor_cls, processor_args: dict, backend: str, pdf_path: str,
+                   indices: List[int]) -> Tuple[List[Tuple[int, Optional[str], List[tuple]]], Optional[dict]]:
+    # Runs in a worker process. Converters hold regex formatters (lambdas)
+    # that can't be pickled, so each worker builds its own processor from
+    # the constructor arguments its parent handed over (worker_args). Page
+    # texts go back with the results for the parent to store, and stage
+    # timings too (see timings); when the parent is itself a batch worker,
+    # its own stores are deferred to the batch's parent (see batch_cli).
+    processor = processor_cls(None, **processor_args)
+    results = [(page_number, text, _page_rows(processor, text))
+               for page_number, text in get_backend(backend).iter_selected_texts(pdf_path, indices)]
+    return results, timings.snapshot()
+
+
+def _iter_selected(processor, pdf_path: str, workers: int, backend: str,
+                   indices: List[int]) -> Iterator[Tuple[int, Optional[str], List[tuple]]]:
+    if workers > 1 and len(indices) >= MIN_PARALLEL_PAGES:
+        chunks = [indices[start:stop] for start, stop in page_ranges(len(indices), workers)]
+        processor_cls = type(processor)
+        processor_args = processor.worker_args() if hasattr(processor, "worker_args") else {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=timings.reset) as executor:
+            # map() yields results in submission order, i.e. page order
+            for chunk, chunk_timings in executor.map(_extract_pages,
+                                                     [processor_cls] * len(chunks),
+                                                     [processor_args] * len(chunks),
+                                                     [backend] * len(chunks),
+                                                     [pdf_path] * len(chunks),
+                                                     chunks):
+                timings.merge(chunk_timings)
+                yield from chunk
+        return
+    for page_number, text in get_backend(backend).iter_selected_texts(pdf_path, indices):
+        yield page_number, text, _page_rows(processor, text)
+
+
+def _iter_extracted(processor, pdf_path: str, workers: int, backend: str,
+                    prefilter: bool = True) -> Iterator[Tuple[int, Optional[str], List[tuple]]]:
+    """
+    (page_number, text, rows) straight from the PDF, in page order. With
+    ``prefilter``, pages the pre-scan rules out are never handed to the
+    backend and come through with _SKIPPED as their text and no rows.
+    """
+    page_count = get_backend(backend).page_count(pdf_path)
+    indices = list(range(page_count))
+    sizes = []
+    prescan_time = 0.0
+    # The pre-scan is a PyPDF2 read, so only worth it in front of a slower backend
+    if prefilter and backend != "pypdf2":
+        start = time.perf_counter()
+        with timings.stage("prescan"):
+            candidates, sizes = prescan_pages(pdf_path)
+        prescan_time = time.perf_counter() - start
+        if candidates is not None:
+            indices = candidates
+
+    start = time.perf_counter()
+    next_page = 1
+    for page_number, text, rows in _iter_selected(processor, pdf_path, workers, backend, indices):
+        for skipped_page in range(next_page, page_number):
+            yield skipped_page, _SKIPPED, []
+        yield page_number, text, rows
+        next_page = page_number + 1
+    for skipped_page in range(next_page, page_count + 1):
+        yield skipped_page, _SKIPPED, []
+
+    skipped = page_count - len(indices)
+    if skipped:
+        # Extraction time grows with the amount of text on a page, so the
+        # skipped pages are costed at the rate measured on the others
+        elapsed = time.perf_counter() - start
+        read_chars = sum(sizes[index] for index in indices)
+        skipped_chars = sum(sizes) - read_chars
+        saved = max(0.0, elapsed * skipped_chars / max(1, read_chars) - prescan_time)
+        print(f"Pre-filter: skipped {skipped} of {page_count} pages, "
+              f"saved ~{saved:.2f}s (pre-scan took {prescan_time:.2f}s)")
+
+
+def iter_page_rows_parallel(processor, pdf_path: str, workers: int, backend: str = DEFAULT_BACKEND,
+                            prefilter: bool = True) -> Iterator[Tuple[int, List[tuple]]]:
+    """
+    Same stream as ``iter_page_rows(processor, pdf_path)``, with pages
+    fanned out to ``workers`` processes and yielded back in page order.
+    """
+    for page_number, _, rows in _iter_extracted(processor, pdf_path, workers, backend, prefilter):
+        yield page_number, rows
+
+
+def _iter_and_store(processor, pdf_path: str, workers: int, backend: str, prefilter: bool,
+                    store: PageTextStore, doc_hash: str) -> Iterator[Tuple[int, List[tuple]]]:
+    texts = []
+    prefiltered = False
+    for page_number, text, rows in _iter_extracted(processor, pdf_path, workers, backend, prefilter):
+        # Pages the pre-filter skipped are stored without text (no converter
+        # gets rows out of a page without a task number), and the document
+        # as pre-filtered so a read without the pre-filter doesn't use it
+        if text is _SKIPPED:
+            text = None
+            prefiltered = True
+        texts.append(text)
+        yield page_number, rows
+    # Only reached once every page has been read
+    store.save(doc_hash, get_backend(backend).extractor, texts, prefiltered)
+
+
+def _iter_texts(processor, texts: List[Optional[str]]) -> Iterator[Tuple[int, List[tuple]]]:
+    return ((page_number, _page_rows(processor, text))
+            for page_number, text in enumerate(texts, 1))
+
+
+def _counted(pages: Iterator[Tuple[int, List[tuple]]]) -> Iterator[Tuple[int, List[tuple]]]:
+    for page in pages:
+        timings.count("pages")
+        yield page
+
+
+def iter_pages(processor, pdf_path: str, workers: int = 1, store: PageTextStore = None,
+               backend: str = DEFAULT_BACKEND, prefilter: bool = True) -> Iterator[Tuple[int, List[tuple]]]:
+    """
+    (page_number, rows) for every page, from stored page text when this
+    document has been read before and from the PDF otherwise. Stored text
+    is parsed in this process: without pdfplumber in the way the regex work
+    is too cheap to be worth starting a worker pool for.
+
+    ``backend`` names a text_backends backend, "auto" to let
+    choose_backend decide for this document, or "words" for column bands
+    (see word_columns). ``prefilter`` skips pages prescan_pages rules out
+    when reading with a slow backend; without it, text stored from a
+    pre-filtered read isn't used and every page is read.
+    """
+    pages = _iter_pages(processor, pdf_path, workers, store, backend, prefilter)
+    return _counted(pages) if timings.enabled else pages
+
+
+def _iter_pages(processor, pdf_path: str, workers: int, store: Optional[PageTextStore], backend: str,
+                prefilter: bool) -> Iterator[Tuple[int, List[tuple]]]:
+    if backend == WORDS:
+        # word_columns builds on this module
+        from word_columns import iter_word_pages
+        return iter_word_pages(processor, pdf_path, workers, prefilter)
+
+    store = store if store is not None else PageTextStore()
+    doc_hash = file_hash(pdf_path)
+    if backend == AUTO:
+        # Text pdfplumber already produced is as good as it gets
+        texts = store.load(doc_hash, get_backend("pdfplumber").extractor, prefilter)
+        if texts is not None:
+            return _iter_texts(processor, texts)
+        with timings.stage("choose_backend"):
+            chosen, texts = choose_backend(processor, pdf_path)
+        if texts is not None:
+            store.save(doc_hash, chosen.extractor, texts)
+            return _iter_texts(processor, texts)
+        backend = chosen.name
+
+    texts = store.load(doc_hash, get_backend(backend).extractor, prefilter)
+    if texts is not None:
+        return _iter_texts(processor, texts)
+    return _iter_and_store(processor, pdf_path, workers, backend, prefilter, store, doc_hash)
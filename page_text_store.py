@@ -0,0 +1,143 @@
+"""
+Persistent store of extracted page text, so pdfplumber runs once per PDF.
+
+Text is kept zlib-compressed in ``data/page_text.db``, keyed by the SHA-256
+of the PDF's bytes, the extractor that produced it (library and version,
+since an upgrade can change the text) and the page number. A document is
+only recorded once all of its pages are in, so an interrupted run leaves
+nothing half-stored behind. Documents read with the pre-filter (see
+page_pipeline) are marked as such, since the pages it skipped were never
+read and are stored without text.
+
+Worker processes of a batch don't write the store themselves: after
+defer_saves() their saves are held back, and the parent takes them with
+the worker's results (take_deferred) and writes them (save_all), so the
+store only ever has one writer.
+"""
+import os
+import sqlite3
+import zlib
+from typing import List, Optional, Tuple
+
+import timings
+from ensure_directories import ensure_app_directories
+
+STORE_FILE_NAME = "page_text.db"
+
+# How long a connection waits for another one's lock before failing
+BUSY_TIMEOUT = 30.0
+
+# (doc_hash, extractor, texts, prefiltered) saves held back in this process; None: save straight away
+_deferred: Optional[List[Tuple[str, str, List[Optional[str]], bool]]] = None
+
+
+def defer_saves():
+    """Hold back this process's saves until take_deferred (e.g. in a pool's worker initializer)."""
+    global _deferred
+    _deferred = []
+
+
+def take_deferred() -> List[Tuple[str, str, List[Optional[str]], bool]]:
+    """Saves held back since the last call, for the parent to write with save_all."""
+    if _deferred is None:
+        return []
+    pending = list(_deferred)
+    _deferred.clear()
+    return pending
+
+
+class PageTextStore:
+    def __init__(self, db_path: str = None):
+        if db_path is None:
+            data_dir, _ = ensure_app_directories()
+            db_path = os.path.join(data_dir, STORE_FILE_NAME)
+        self.db_path = db_path
+        self.setup_database()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT)
+
+    def setup_database(self):
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS documents (
+                        doc_hash TEXT,
+                        extractor TEXT,
+                        page_count INTEGER,
+                        prefiltered INTEGER,
+                        PRIMARY KEY (doc_hash, extractor)
+                    )
+                ''')
+                # Stores from before the flag: their documents are treated
+                # as possibly pre-filtered (NULL)
+                cursor.execute('PRAGMA table_info(documents)')
+                if 'prefiltered' not in [column[1] for column in cursor.fetchall()]:
+                    cursor.execute('ALTER TABLE documents ADD COLUMN prefiltered INTEGER')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS pages (
+                        doc_hash TEXT,
+                        extractor TEXT,
+                        page_number INTEGER,
+                        text BLOB,
+                        PRIMARY KEY (doc_hash, extractor, page_number)
+                    )
+                ''')
+                conn.commit()
+        except Exception as e:
+            print(f"Page text store setup error: {str(e)}")
+
+    @timings.timed("page_text_store.load")
+    def load(self, doc_hash: str, extractor: str, prefiltered: bool = True) -> Optional[List[Optional[str]]]:
+        """
+        Text of every page in order (None for pages without text), or None if
+        not stored. Without ``prefiltered``, a document stored from a
+        pre-filtered read counts as not stored.
+        """
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT page_count, prefiltered FROM documents WHERE doc_hash = ? AND extractor = ?',
+                               (doc_hash, extractor))
+                found = cursor.fetchone()
+                if found is None or (not prefiltered and found[1] != 0):
+                    return None
+                cursor.execute('''
+                    SELECT text FROM pages
+                    WHERE doc_hash = ? AND extractor = ?
+                    ORDER BY page_number
+                ''', (doc_hash, extractor))
+                texts = [zlib.decompress(blob).decode('utf-8') if blob is not None else None
+                         for blob, in cursor.fetchall()]
+            return texts if len(texts) == found[0] else None
+        except Exception as e:
+            print(f"Page text load error: {str(e)}")
+            return None
+
+    @timings.timed("page_text_store.save")
+    def save(self, doc_hash: str, extractor: str, texts: List[Optional[str]], prefiltered: bool = False):
+        if _deferred is not None:
+            _deferred.append((doc_hash, extractor, texts, prefiltered))
+            return
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM pages WHERE doc_hash = ? AND extractor = ?',
+                               (doc_hash, extractor))
+                cursor.executemany('INSERT INTO pages (doc_hash, extractor, page_number, text) VALUES (?, ?, ?, ?)',
+                                   ((doc_hash, extractor, page_number,
+                                     zlib.compress(text.encode('utf-8')) if text is not None else None)
+                                    for page_number, text in enumerate(texts, 1)))
+                cursor.execute('''
+                    INSERT OR REPLACE INTO documents (doc_hash, extractor, page_count, prefiltered)
+                    VALUES (?, ?, ?, ?)
+                ''', (doc_hash, extractor, len(texts), int(prefiltered)))
+                conn.commit()
+        except Exception as e:
+            print(f"Page text save error: {str(e)}")
+
+    def save_all(self, saves: List[Tuple[str, str, List[Optional[str]], bool]]):
+        """Write saves held back in another process (see take_deferred)."""
+        for doc_hash, extractor, texts, prefiltered in saves:
+            self.save(doc_hash, extractor, texts, prefiltered)
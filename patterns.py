@@ -0,0 +1,95 @@
+"""
+Regular expressions shared by the converters, compiled once at import.
+
+The converters used to pass these as string literals to re.search() and
+friends on every line, which goes through the ``re`` module cache on each
+call. Run this module directly for a per-line microbenchmark of the string
+vs. precompiled forms.
+"""
+import re
+
+# 12/34/56/789/012/345
+TASK_NUMBER = re.compile(r"\b(\d{2}/\d{2}/\d{2}/\d{3}/\d{3}/\d{3})\b")
+
+# ATA chapter/section, from the task number or an explicit "ATA 62-11"
+ATA_FROM_TASK = re.compile(r"\b(\d{2})/(\d{2})/\d{2}/\d{3}/\d{3}/\d{3}\b")
+ATA_LABEL = re.compile(r"ATA\s+(\d{2})\s*[-\s]\s*(\d{2})")
+
+# Description = text after the task number, up to the first column that
+# follows it: where one of these matches first (see descriptions.py).
+# Documentation layouts (TDDM/TDDIM) stop at a MET reference, part-number
+# layouts (TDMPLM/TDMPLMD) at a TSM/TSI limit.
+DESCRIPTION_END_DOC = re.compile(r"ALL\s+MP/N|\d{6}|\d{3}[A-Z]|\b\d+\s*[MF]H|\bMET")
+DESCRIPTION_END_LIMIT = re.compile(r"ALL\s+MP/N|\d{6}|\d{3}[A-Z]|\b\d+\s*[MF]H|\bTSM|\bTSI")
+
+TASK_NUMBER_ANYWHERE = re.compile(r"\b\d{2}/\d{2}/\d{2}/\d{3}/\d{3}/\d{3}\b")
+LEADING_WHITESPACE = re.compile(r"\s*")
+
+# TASK_NUMBER found from its first slash, for scanning a whole page: a
+# literal first character lets the regex engine skip ahead to candidates
+# rather than try the pattern at every position. The match starts two
+# characters into the task number.
+TASK_NUMBER_SCAN = re.compile(r"/\d{2}/\d{2}/\d{3}/\d{3}/\d{3}\b(?<=\b\d\d/\d\d/\d\d/\d\d\d/\d\d\d/\d\d\d)")
+
+# Page pre-scan, run on text with all whitespace removed
+TASK_NUMBER_COMPACT = re.compile(r"\d{2}/\d{2}/\d{2}/\d{3}/\d{3}/\d{3}")
+
+# Description clean-up
+PARENTHETICAL = re.compile(r"\([^)]*\)")
+WHITESPACE = re.compile(r"\s+")
+
+# Limit / interval, most specific first: pattern, unit of its values
+# ("M" months, "FH" flight hours)
+LIMIT_PATTERNS = [
+    (re.compile(r"(\d+)\s*M\s*,\s*(\d+)\s*M"), "M"),
+    (re.compile(r"(\d+)\s*FH\s*,\s*(\d+)\s*FH"), "FH"),
+    (re.compile(r"(\d+)\s*M\s*(?:TSM|TSI)"), "M"),
+    (re.compile(r"(\d+)\s*FH"), "FH"),
+    (re.compile(r"(\d+)\s*M"), "M"),
+]
+
+# Documentation references
+MET_REF = re.compile(r"\b(MET\s+\d{2}\.\d{2}\.\d{2}\.\d{3})\b")
+MET_OR_CMM_REF = re.compile(r"\b(CMM\s+\d{2}\.\d{2}\.\d{2}|MET\s+\d{2}\.\d{2}\.\d{2}\.\d{3})\b")
+
+# MP/N column
+ALL_MPN = re.compile(r"\bALL\s+MP/N\b", re.IGNORECASE)
+MPN_WITH_PN = re.compile(r"([0-9A-Z-]+(?:\s+[A-Z])?)\s*\(([^)]+)\)")
+
+
+def _benchmark(repeat: int = 2000):
+    import timeit
+
+    lines = [
+        "12/34/56/789/012/345 INSPECT MAIN ROTOR HUB 355A12-51 03-00 (704A33) 24 M MET 21.51.10.601",
+        "CHECK TAIL ROTOR DRIVE SHAFT (ZONAL) - GENERAL 600 FH, 1200 FH",
+        "REPLACE FILTER ELEMENT ALL MP/N 6 M TSM CMM 25.69.87",
+        "NOTE: REFER TO ATA 62-11 FOR ACCESS",
+    ]
+    compiled = [TASK_NUMBER, ATA_FROM_TASK, ATA_LABEL, DESCRIPTION_END_LIMIT,
+                TASK_NUMBER_ANYWHERE, PARENTHETICAL,
+                MET_OR_CMM_REF] + [pattern for pattern, _ in LIMIT_PATTERNS]
+    strings = [pattern.pattern for pattern in compiled]
+
+    def run_strings():
+        for line in lines:
+            for pattern in strings:
+                re.search(pattern, line)
+
+    def run_compiled():
+        for line in lines:
+            for pattern in compiled:
+                pattern.search(line)
+
+    per_line = 1e6 / (repeat * len(lines))
+    before = timeit.timeit(run_strings, number=repeat) * per_line
+    after = timeit.timeit(run_compiled, number=repeat) * per_line
+    print(f"{len(compiled)} patterns per line")
+    print(f"re.search(str, line):   {before:8.2f} us/line")
+    print(f"compiled.search(line):  {after:8.2f} us/line")
+    print(f"speedup:                {before / after:8.2f}x")
+
+
+if __name__ == "__main__":
+    # Microbenchmark the string vs. precompiled forms when run directly
+    _benchmark()
@@ -0,0 +1,133 @@
+"""
+Registry of the documentation references (MET / CMM) matched on task lines.
+
+References are normalized to one spelling -- kind in capitals, one space,
+then the number ("MET 21.51.10.601") -- however the PDF text spaced them,
+and every converter in a process records into the one shared registry
+(see shared_registry), so a reference is stored once whichever layout
+matched it. Lookups are dict lookups, and the registry holds at most
+``max_size`` references, forgetting the least recently seen first, so a
+long run or many runs in one process cost the same per task line.
+
+With a database the registry is seeded from its known_refs table, and
+save() writes back the references matched since. References matched in
+worker processes stay in those processes.
+
+Run this module for a benchmark against the list the converters used to
+append every match to.
+"""
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+# Distinct references kept before the least recently seen are forgotten
+MAX_REFS = 50000
+
+
+def normalize_reference(ref: str) -> str:
+    """'met  21.51.10.601' -> 'MET 21.51.10.601'"""
+    return " ".join(ref.split()).upper()
+
+
+class ReferenceRegistry:
+    def __init__(self, max_size: int = MAX_REFS):
+        self.max_size = max_size
+        # Spelling as matched -> normalized reference, most recently seen last
+        self._refs = OrderedDict()
+        self._unsaved = OrderedDict()
+        self._loaded = set()
+
+    def add(self, ref: str) -> str:
+        """Record a matched reference; returns its normalized spelling (one string object per reference)."""
+        normalized = self._refs.get(ref)
+        if normalized is not None:
+            self._refs.move_to_end(ref)
+            return normalized
+        normalized = normalize_reference(ref)
+        # Other spellings of a known reference share its string
+        normalized = self._refs.get(normalized, normalized)
+        self._refs[ref] = self._refs[normalized] = normalized
+        self._unsaved[normalized] = None
+        while len(self._refs) > self.max_size:
+            self._refs.popitem(last=False)
+        if len(self._unsaved) > self.max_size:
+            self._unsaved.popitem(last=False)
+        return normalized
+
+    def __contains__(self, ref: str) -> bool:
+        return ref in self._refs or normalize_reference(ref) in self._refs
+
+    def __len__(self) -> int:
+        return len(set(self._refs.values()))
+
+    def __iter__(self) -> Iterator[str]:
+        # Normalized references, least recently seen first
+        return iter(dict.fromkeys(self._refs.values()))
+
+    def load(self, db):
+        """Seed from the database's known_refs table, once per database."""
+        if db is None or db.db_path in self._loaded:
+            return
+        self._loaded.add(db.db_path)
+        for ref in db.get_known_refs():
+            normalized = normalize_reference(ref)
+            self._refs.setdefault(normalized, normalized)
+        while len(self._refs) > self.max_size:
+            self._refs.popitem(last=False)
+
+    def save(self, db):
+        """Write the references matched since the last save to the database."""
+        if db is None or not self._unsaved:
+            return
+        db.add_known_refs(self._unsaved)
+        self._unsaved.clear()
+
+
+_shared: Optional[ReferenceRegistry] = None
+
+
+def shared_registry(db=None) -> ReferenceRegistry:
+    """The registry all converters in this process record into, seeded from ``db`` if given."""
+    global _shared
+    if _shared is None:
+        _shared = ReferenceRegistry()
+    _shared.load(db)
+    return _shared
+
+
+def _benchmark(task_lines: int = 100000, distinct: int = 20000):
+    import random
+    import time
+
+    random.seed(0)
+    refs = [f"MET {random.randint(5, 80):02d}.{random.randint(0, 99):02d}.{random.randint(0, 99):02d}."
+            f"{random.randint(0, 999):03d}" for _ in range(distinct)]
+    lines = [random.choice(refs) for _ in range(task_lines)]
+    step = task_lines // 10
+
+    def per_call(record) -> list:
+        # Mean cost (µs) of recording a reference over each tenth of the lines
+        costs = []
+        for tenth in range(10):
+            start = time.perf_counter()
+            for ref in lines[tenth * step:(tenth + 1) * step]:
+                record(ref)
+            costs.append((time.perf_counter() - start) / step * 1e6)
+        return costs
+
+    known_refs = []
+
+    def append_checked(ref) -> bool:
+        # What the converters used to do: test against every match so far, then append
+        known = ref in known_refs
+        known_refs.append(ref)
+        return known
+
+    registry, capped = ReferenceRegistry(), ReferenceRegistry(max_size=distinct // 4)
+    for name, record in [("list", append_checked), ("registry", registry.add), ("capped", capped.add)]:
+        costs = per_call(record)
+        print(f"{name:>8}: " + " ".join(f"{cost:7.2f}" for cost in costs) + " µs per call, by tenth of the lines")
+    print(f"list holds {len(known_refs)} entries, registry {len(registry)}, capped registry {len(capped)}")
+
+
+if __name__ == "__main__":
+    _benchmark()
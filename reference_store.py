@@ -0,0 +1,94 @@
+"""
+The Reference column -- the three lines of context around each task --
+kept once per distinct text.
+
+Rows of one task line repeat its context for every MP/N pair (TDMPLM,
+TDMPLMD) or documentation item (TDDM, TDDIM), and it is by far the widest
+column. In a DataFrame FrameBuilder holds each distinct text once and
+the column's rows all point at it, while preview, export and iteration
+see plain strings. In the database rows carry a content hash and the text lives once in ``reference_texts``, zlib-compressed
+unless the Database was opened with ``compress_references=False``.
+
+Run this module on a PDF to compare memory and disk use.
+"""
+import hashlib
+import os
+import sqlite3
+import zlib
+from typing import Optional, Tuple, Union
+
+import pandas as pd
+
+REFERENCE_COLUMN = "Reference"
+
+
+def reference_id(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def pack(text: str, compress: bool = True) -> Tuple[Union[str, bytes], int]:
+    """(stored value, compressed flag) for a reference_texts row."""
+    if compress:
+        return zlib.compress(text.encode("utf-8")), 1
+    return text, 0
+
+
+def unpack(value: Union[str, bytes], compressed: int) -> str:
+    return zlib.decompress(value).decode("utf-8") if compressed else value
+
+
+def _vacuumed_size(path: str) -> int:
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    conn.close()
+    return os.path.getsize(path)
+
+
+def _compare(pdf_path: str, converter: Optional[str] = None):
+    import tempfile
+    import tracemalloc
+
+    from db_handler import Database
+    from format_processor import PDFProcessor
+
+    names = [converter] if converter else ["tddm", "tddim", "tdmplm", "tdmplmd"]
+    print(f"{'':>8} {'rows':>7} {'distinct':>8} | {'memory object':>13} {'categorical':>11} | "
+          f"{'db inline':>9} {'dedup':>7} {'dedup+zlib':>10}")
+    for name in names:
+        processor = PDFProcessor(None, name)
+        df = processor.extract_dataframe(pdf_path, use_cache=False)
+        texts = df[REFERENCE_COLUMN].astype(str).tolist()
+
+        # Rows read back from a file or database don't share string objects
+        tracemalloc.start()
+        inline = pd.Series([text.encode("utf-8").decode("utf-8") for text in texts], dtype=object)
+        inline_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        tracemalloc.start()
+        compact = pd.Series([text.encode("utf-8").decode("utf-8") for text in texts], dtype=object).astype("category")
+        compact_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del inline, compact
+
+        sizes = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for compress in [False, True]:
+                db = Database(os.path.join(tmp, f"dedup{int(compress)}.db"), compress_references=compress)
+                db.save_processed_rows(list(df.columns), df.itertuples(index=False, name=None))
+                sizes.append(_vacuumed_size(db.db_path))
+            # The same rows with the text inline, as pdf_data stored them before
+            with sqlite3.connect(os.path.join(tmp, "dedup0.db")) as conn:
+                conn.execute("UPDATE pdf_data SET reference = (SELECT text FROM reference_texts "
+                             "WHERE reference_texts.ref_id = pdf_data.reference)")
+                conn.execute("DELETE FROM reference_texts")
+            sizes.insert(0, _vacuumed_size(os.path.join(tmp, "dedup0.db")))
+
+        print(f"{name:>8} {len(texts):>7} {len(set(texts)):>8} | {inline_bytes / 1e6:>11.1f}MB "
+              f"{compact_bytes / 1e6:>9.1f}MB | " + " ".join(f"{size / 1e6:>7.1f}MB" for size in sizes))
+
+
+if __name__ == "__main__":
+    # python reference_store.py <pdf> [converter]
+    import sys
+
+    _compare(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
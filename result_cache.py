@@ -0,0 +1,182 @@
+"""
+Persistent cache of extraction results, stored under ``data/cache``.
+
+An entry is addressed by the SHA-256 of the PDF's bytes, the converter and
+text backend that produced it and a parser version. The version is a hash
+of the converter's own source, the shared extraction modules and whatever
+state the processor reports through ``cache_state()`` (e.g. the MP/N
+catalog), so editing any extraction rule or adding a known MP/N makes old
+entries unreachable without anyone having to remember to bump a number.
+Unreachable entries of a converter are deleted the next time it stores one.
+"""
+import hashlib
+import importlib
+import inspect
+import marshal
+import os
+import sys
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import pandas as pd
+
+import timings
+from ensure_directories import ensure_app_directories
+from text_backends import DEFAULT_BACKEND
+
+# Bump when the on-disk entry format changes
+CACHE_FORMAT = 1
+
+# Modules whose code decides what a converter extracts
+EXTRACTION_MODULES = ["extraction_engine", "frame_builder", "reference_store", "page_pipeline", "word_columns",
+                      "text_backends", "patterns", "mpn_matcher", "mpn_catalog", "descriptions",
+                      "reference_registry"]
+
+_CHUNK_SIZE = 1 << 20
+
+
+def cache_dir() -> str:
+    data_dir, _ = ensure_app_directories()
+    path = os.path.join(data_dir, "cache")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _module_code(module) -> bytes:
+    try:
+        return inspect.getsource(module).encode("utf-8")
+    except (OSError, TypeError):
+        # Frozen builds ship bytecode only
+        return marshal.dumps(module.__loader__.get_code(module.__name__))
+
+
+@lru_cache(maxsize=None)
+def _source_version(module_name: str) -> str:
+    digest = hashlib.sha256()
+    for name in [module_name] + EXTRACTION_MODULES:
+        # Imported here if need be: some (word_columns) are only loaded on use,
+        # and the version mustn't depend on what happens to be loaded already
+        module = importlib.import_module(name)
+        digest.update(name.encode("utf-8"))
+        digest.update(_module_code(module))
+    return digest.hexdigest()
+
+
+def converter_name(processor) -> str:
+    # A format's processor is named after its format, anything else after its module
+    format_name = getattr(processor, "format_name", None)
+    if format_name:
+        return format_name
+    module = sys.modules.get(type(processor).__module__)
+    path = getattr(module, "__file__", None)
+    if path:
+        return os.path.splitext(os.path.basename(path))[0]
+    return type(processor).__module__
+
+
+def parser_version(processor) -> str:
+    digest = hashlib.sha256(f"{CACHE_FORMAT}:{_source_version(type(processor).__module__)}".encode("utf-8"))
+    if hasattr(processor, "cache_state"):
+        digest.update(processor.cache_state().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def cache_key(pdf_path: str, processor, backend: str = DEFAULT_BACKEND) -> str:
+    with timings.stage("result_cache.key"):
+        return (f"{converter_name(processor)}-{backend}-{file_hash(pdf_path)[:32]}"
+                f"-{parser_version(processor)[:16]}")
+
+
+def rules_key(processor, backend: str = DEFAULT_BACKEND) -> str:
+    # What a page's rows depend on besides the page itself (see revisions)
+    return f"{converter_name(processor)}-{backend}-{parser_version(processor)[:16]}"
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(cache_dir(), f"{key}.pkl")
+
+
+def _key_parts(key: str) -> Tuple[str, str]:
+    # (converter, parser version) of a key made by cache_key, possibly with
+    # a format name appended (see ExtractionEngine.extract_dataframes)
+    parts = key.split("-")
+    return (parts[0], parts[3]) if len(parts) >= 4 else (key, "")
+
+
+def prune(key: str) -> int:
+    """Delete the entries of ``key``'s converter made under another parser version."""
+    converter, version = _key_parts(key)
+    directory = cache_dir()
+    removed = 0
+    for name in os.listdir(directory):
+        if not name.endswith(".pkl"):
+            continue
+        entry_converter, entry_version = _key_parts(name[:-len(".pkl")])
+        if entry_converter == converter and entry_version != version:
+            try:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+            except OSError:
+                # Another process got there first
+                pass
+    return removed
+
+
+def load(key: str) -> Optional[pd.DataFrame]:
+    path = _entry_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with timings.stage("result_cache.load"):
+            return pd.read_pickle(path)
+    except Exception as e:
+        print(f"Cache load error: {str(e)}")
+        return None
+
+
+def store(key: str, df: pd.DataFrame):
+    path = _entry_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with timings.stage("result_cache.store"):
+            df.to_pickle(tmp_path)
+        # Readers never see a half-written entry
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Cache store error: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    with timings.stage("result_cache.prune"):
+        prune(key)
+
+
+def clear():
+    directory = cache_dir()
+    for name in os.listdir(directory):
+        if name.endswith(".pkl"):
+            os.remove(os.path.join(directory, name))
+
+
+if __name__ == "__main__":
+    # Time a cold run against a cached one: python result_cache.py <pdf> [converter]
+    import time
+
+    pdf_path = sys.argv[1]
+    from format_processor import PDFProcessor
+
+    processor = PDFProcessor(None, sys.argv[2] if len(sys.argv) > 2 else "tdmplm")
+    key = cache_key(pdf_path, processor)
+    for label in ["cold", "cached"]:
+        start = time.perf_counter()
+        df = processor.extract_dataframe(pdf_path)
+        print(f"{label:>6}: {len(df)} rows in {(time.perf_counter() - start) * 1e3:.1f} ms")
+    print(f"entry: {_entry_path(key)}")
@@ -0,0 +1,198 @@
+"""
+Incremental re-extraction of revised PDFs.
+
+Maintenance programs are reissued as revisions in which only a handful of
+pages change. Every page is fingerprinted from its content stream, boxes
+and rotation, the fonts it uses and the forms it draws (read with PyPDF2,
+well under a millisecond a page), and the rows extracted from it are kept
+in the database under that fingerprint and the rules that produced them
+(see result_cache.rules_key) -- with the words backend, also the
+document's layout template. Processing a revision then
+extracts only the pages not seen before under the same rules and carries
+every other page's rows over, for the same result as a full run.
+
+The previous revision is the stored one sharing the most pages with the
+new one, so a revision needn't keep its file name. Its rows and the new
+ones are compared task by task for the list of changed tasks.
+
+Run this module on two revisions of a PDF for a comparison with a full run.
+"""
+import hashlib
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import pandas as pd
+import PyPDF2
+from PyPDF2.generic import IndirectObject
+
+import page_pipeline
+import result_cache
+import timings
+from db_handler import Database
+from frame_builder import build_frame
+from text_backends import AUTO, DEFAULT_BACKEND, WORDS
+
+CHANGE_COLUMNS = ["Task Number", "Change"]
+
+
+def _hash_resources(digest, resources, seen: set):
+    # Fonts by name and Form XObjects by content, recursively: the same
+    # character codes through another font can be other text, and a form
+    # draws text of its own
+    resources = resources.get_object() if resources is not None else None
+    if not resources:
+        return
+    fonts = resources.get("/Font")
+    if fonts is not None:
+        for name, font in sorted(fonts.get_object().items()):
+            digest.update(f"{name}={font.get_object().get('/BaseFont')}".encode("utf-8"))
+    xobjects = resources.get("/XObject")
+    if xobjects is None:
+        return
+    for name, reference in sorted(xobjects.get_object().items()):
+        xobject = reference.get_object()
+        digest.update(f"{name}:{xobject.get('/Subtype')}".encode("utf-8"))
+        if xobject.get("/Subtype") != "/Form":
+            continue
+        # A form used more than once, or by itself, is hashed once
+        key = (reference.idnum, reference.generation) if isinstance(reference, IndirectObject) else id(xobject)
+        if key in seen:
+            continue
+        seen.add(key)
+        digest.update(xobject.get_data())
+        digest.update(repr(xobject.get("/Matrix")).encode("utf-8"))
+        _hash_resources(digest, xobject.get("/Resources"), seen)
+
+
+def page_fingerprints(pdf_path: str) -> List[str]:
+    """
+    SHA-256 of each page's content stream, its boxes and rotation, the
+    fonts it names and the Form XObjects it draws, in page order.
+    """
+    fingerprints = []
+    with open(pdf_path, "rb") as f:
+        for page in PyPDF2.PdfReader(f).pages:
+            digest = hashlib.sha256()
+            contents = page.get_contents()
+            digest.update(contents.get_data() if contents is not None else b"")
+            # Text outside the crop box isn't extracted; rotation changes the reading order
+            digest.update(f"{list(page.mediabox)}{list(page.cropbox)}{page.get('/Rotate', 0)}".encode("utf-8"))
+            _hash_resources(digest, page.get("/Resources"), set())
+            fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+def _task_rows(rows: List[tuple], task_column: int) -> Dict[str, Counter]:
+    tasks = {}
+    for row in rows:
+        # Compared as multisets: converters needn't keep a task's rows in one order
+        tasks.setdefault(row[task_column], Counter())[row] += 1
+    return tasks
+
+
+def task_changes(columns: List[str], old_rows: List[tuple], new_rows: List[tuple]) -> pd.DataFrame:
+    """
+    Tasks "added", "changed" (any of their rows differ) or "removed"
+    between two revisions' rows, in the new revision's order and then the
+    old one's.
+    """
+    task_column = columns.index("Task Number")
+    old, new = _task_rows(old_rows, task_column), _task_rows(new_rows, task_column)
+    changes = []
+    for task, rows in new.items():
+        if task not in old:
+            changes.append((task, "added"))
+        elif rows != old[task]:
+            changes.append((task, "changed"))
+    changes.extend((task, "removed") for task in old if task not in new)
+    return pd.DataFrame(changes, columns=CHANGE_COLUMNS)
+
+
+def extract_revision(processor, db: Database, pdf_path: str, workers: int = 1,
+                     backend: str = DEFAULT_BACKEND) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (rows of the whole PDF, changed tasks since the previous revision),
+    extracting only the pages the database holds no rows for.
+    """
+    if backend == AUTO:
+        chosen, _ = page_pipeline.choose_backend(processor, pdf_path)
+        backend = chosen.name
+    rules = result_cache.rules_key(processor, backend)
+    doc_hash = result_cache.file_hash(pdf_path)
+    with timings.stage("page_fingerprints"):
+        fingerprints = page_fingerprints(pdf_path)
+
+    carry_over = True
+    if backend == WORDS:
+        # Column bands come from the document's layout template, so rows
+        # carry over only between documents with the same one. Without a
+        # template a page's bands may be the previous page's header, which
+        # the page's fingerprint says nothing about: every page is extracted.
+        from word_columns import document_template
+        template = document_template(pdf_path, list(range(len(fingerprints))))
+        if template is None:
+            carry_over = False
+        else:
+            rules = f"{rules}-{template.fingerprint()}"
+
+    page_rows = db.get_page_rows(rules, fingerprints) if carry_over else {}
+    missing = [index for index, fingerprint in enumerate(fingerprints) if fingerprint not in page_rows]
+    extracted = {}
+    for page_number, rows in page_pipeline.iter_selected_pages(processor, pdf_path, missing, workers, backend):
+        extracted[fingerprints[page_number - 1]] = rows
+    page_rows.update(extracted)
+    timings.count("pages", len(missing))
+    timings.count("pages_carried_over", len(fingerprints) - len(missing))
+    print(f"Revision: extracted {len(missing)} of {len(fingerprints)} pages, "
+          f"carried over {len(fingerprints) - len(missing)}")
+    rows = [row for fingerprint in fingerprints for row in page_rows.get(fingerprint, [])]
+
+    old_rows = []
+    previous = db.find_previous_revision(doc_hash, rules, fingerprints)
+    if previous is not None:
+        old_pages = db.get_revision_pages(previous, rules)
+        page_rows.update(db.get_page_rows(rules, [page for page in old_pages if page not in page_rows]))
+        old_rows = [row for fingerprint in old_pages for row in page_rows.get(fingerprint, [])]
+    db.save_revision(doc_hash, rules, fingerprints, extracted)
+
+    return build_frame(rows, processor.columns), task_changes(processor.columns, old_rows, rows)
+
+
+def _compare(old_pdf: str, new_pdf: str, converter: str = "tdmplm"):
+    import os
+    import tempfile
+    import time
+
+    from format_processor import PDFProcessor
+    from page_text_store import PageTextStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "revisions.db"))
+        processor = PDFProcessor(db, converter)
+        start = time.perf_counter()
+        # A store of its own, so no page text read by an earlier run is reused
+        store = PageTextStore(os.path.join(tmp, "page_text.db"))
+        full = build_frame((row for _, rows in page_pipeline.iter_pages(processor, new_pdf, store=store)
+                            for row in rows), processor.columns)
+        full_time = time.perf_counter() - start
+
+        extract_revision(processor, db, old_pdf)
+        start = time.perf_counter()
+        df, changes = extract_revision(processor, db, new_pdf)
+        revision_time = time.perf_counter() - start
+
+    def rows(frame):
+        return sorted(tuple(str(value) for value in row) for row in frame.astype(object).itertuples(index=False))
+
+    assert rows(df) == rows(full)
+    print(f"full run: {len(full)} rows in {full_time:.2f}s")
+    print(f"revision: {len(df)} rows in {revision_time:.2f}s ({full_time / revision_time:.1f}x)")
+    print(f"changed tasks: {dict(changes['Change'].value_counts())}")
+    print(changes.head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    # python revisions.py <previous pdf> <revised pdf> [converter]
+    import sys
+
+    _compare(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else "tdmplm")
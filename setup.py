@@ -64,6 +64,27 @@ build_exe_options = {
         ("tdmplm.py", "tdmplm.py"),
         ("tdmplmd.py", "tdmplmd.py"),
         ("ensure_directories.py", "ensure_directories.py"),
+        ("page_pipeline.py", "page_pipeline.py"),
+        ("patterns.py", "patterns.py"),
+        ("descriptions.py", "descriptions.py"),
+        ("limits.py", "limits.py"),
+        ("mpn_matcher.py", "mpn_matcher.py"),
+        ("mpn_catalog.py", "mpn_catalog.py"),
+        ("reference_registry.py", "reference_registry.py"),
+        ("result_cache.py", "result_cache.py"),
+        ("document_store.py", "document_store.py"),
+        ("page_text_store.py", "page_text_store.py"),
+        ("page_memory.py", "page_memory.py"),
+        ("timings.py", "timings.py"),
+        ("text_backends.py", "text_backends.py"),
+        ("extraction_engine.py", "extraction_engine.py"),
+        ("format_detector.py", "format_detector.py"),
+        ("reference_store.py", "reference_store.py"),
+        ("frame_builder.py", "frame_builder.py"),
+        ("word_columns.py", "word_columns.py"),
+        ("revisions.py", "revisions.py"),
+        ("format_processor.py", "format_processor.py"),
+        ("batch_cli.py", "batch_cli.py"),
         ("README.md", "README.md"),
         ("PostInstallationGuide.txt", "PostInstallationGuide.txt"),
         # Create empty data directory structure
@@ -126,6 +147,13 @@ executables = [
         target_name="tdmplmd.exe",
         icon=icon_file,
     ),
+    # Headless batch extraction
+    Executable(
+        "batch_cli.py",
+        base=console_base,
+        target_name="batch_cli.exe",
+        icon=icon_file,
+    ),
 ]
 
 # MSI Installer options
@@ -1,139 +1,22 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import pandas as pd
-import pdfplumber
-import re
 import os
-from typing import List, Dict,Tuple, Any
+import sys
+import multiprocessing
 from db_handler import Database
-
-class PDFProcessor:
-    def __init__(self, db: Database):
-        self.db = db
-        self.columns = ["ATA", "Task Number", "Description", "Documentation",  "Margin", "Reference"]
-        
-        # Common patterns
-        self.known_refs  = [
-            (r'[A-Z]{3}\s*\d{2}\s*.\s*\d{2}\s*.\s*\d{2}\s*.\s*\d{3}\b',lambda m: re.sub(r'\s+', '', m.group(0))),
-            (r'[A-Z]{3}\s*\d{2}\s*.\s*\d{2}\s*.\s*\d{2}\b',lambda m: re.sub(r'\s+', '', m.group(0)))
-        ]
-        
-        # Known good values for pattern matching
-        self.known_doc = { "MET 21.51.10.601","CMM 25.69.87"}
-
-
-    def main():
-        print("Executing tddm.py script!")
-    if __name__ == "__main__":
-        main()
-        
-    
-    def extract_ata(self, text: str) -> str:
-        match = re.search(r"\b(\d{2})/(\d{2})/\d{2}/\d{3}/\d{3}/\d{3}\b", text)
-        if match:
-            return f"{match.group(1)}-{match.group(2)}"
-        match = re.search(r"ATA\s+(\d{2})\s*[-\s]\s*(\d{2})", text)
-        if match:
-            return f"{match.group(1)}-{match.group(2)}"
-        return ""
-    
-    def extract_task_number(self, text: str) -> str:
-        match = re.search(r"\b(\d{2}/\d{2}/\d{2}/\d{3}/\d{3}/\d{3})\b", text)
-        return match.group(0) if match else ""
-
-    def extract_description(self, text: str) -> str:
-        # First try to find description after task number
-        task_match = re.search(r"\b\d{2}/\d{2}/\d{2}/\d{3}/\d{3}/\d{3}\b\s*(.*?)(?=ALL\s+MP/N|\d{6}|\d{3}[A-Z]|\b\d+\s*[MF]H|\bMET|\bMET|$)", text)
-        if task_match:
-            desc = task_match.group(1).strip()
-            # Clean up description
-            desc = re.sub(r'\([^)]*\)', '', desc)  # Remove parenthetical content
-            desc = re.sub(r'\s+', ' ', desc)  # Normalize whitespace
-            desc = re.sub(r'^\s*-\s*', '', desc)  # Remove leading dash
-            desc = desc.strip()
-            if desc:
-                return desc
-        
-        # Fallback to line-by-line search
-        lines = text.split('\n')
-        for line in lines:
-            # Skip task numbers and part numbers
-            if re.search(r'\b\d{2}/\d{2}/\d{2}/\d{3}/\d{3}/\d{3}\b', line):
-                continue
-            if re.search(r'\bALL\s+MP/N\b|\b\d{6}\b|\b\d{3}[A-Z]', line):
-                continue
-            if re.search(r'\b\d+\s*[MF]H\b|\bTSM\b|\bTSI\b', line):
-                continue
-            
-            # Clean up line
-            line = re.sub(r'\([^)]*\)', '', line)  # Remove parenthetical content
-            line = re.sub(r'\s+', ' ', line)  # Normalize whitespace
-            line = re.sub(r'^\s*-\s*', '', line)  # Remove leading dash
-            line = line.strip()
-            
-            if line:
-                return line
-        
-        return "-"
-
-    def extract_documentation(self, text: str) -> List[str]:
-        ref_matches = set()
-
-        # Look for "MET XX.XX.XX.XXX" or "CMM XX.XX.XX" patterns
-        for match in re.finditer(r"\b(CMM\s+\d{2}\.\d{2}\.\d{2}|MET\s+\d{2}\.\d{2}\.\d{2}\.\d{3})\b", text):
-            ref = match.group(1).strip()
-
-            # Check if similar to known references
-            if ref not in self.known_refs:
-                for known_ref in self.known_refs:
-                    if ref in self.known_doc:
-                        ref = known_ref
-                        break
-
-            self.known_refs.append(ref)
-            ref_matches.add(ref)
-
-        return list(ref_matches)  # Return unique matches
-
-
-    def process_pdf(self, pdf_path: str) -> pd.DataFrame:
-        structured_data = {col: [] for col in self.columns}
-        all_refs = set()  # ✅ Collect all unique documentation references
-
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if not text:
-                    continue
-
-                lines = text.split('\n')
-                for i, line in enumerate(lines):
-                    task_number = self.extract_task_number(line)
-                    if task_number:
-                        context = " ".join(lines[i:i+3])
-                        desc = self.extract_description(context)
-                        documentation_refs = self.extract_documentation(context)
-                        ata = self.extract_ata(line)
-
-                        for doc in documentation_refs:
-                            if doc not in all_refs:
-                                print("Extracted:", doc)
-                                all_refs.add(doc)
-
-                            structured_data["ATA"].append(ata)
-                            structured_data["Task Number"].append(task_number)
-                            structured_data["Description"].append(desc)
-                            structured_data["Documentation"].append(doc)
-                            structured_data["Margin"].append("0")
-                            structured_data["Reference"].append(context)
-
-        df = pd.DataFrame(structured_data)
-        self.db.save_processed_data(df)
-        return df
+from page_pipeline import default_workers
+import timings
+from format_processor import PDFProcessor
+from frame_builder import display_frame, set_cell
+from limits import DERIVED_COLUMNS
 
 class EditableTreeview(ttk.Treeview):
-    def __init__(self, master, **kwargs):
+    def __init__(self, master, on_edit=None, read_only=(), **kwargs):
         super().__init__(master, **kwargs)
+        # Called with (row index, column, value) for every saved edit
+        self.on_edit = on_edit
+        # Columns that can't be edited, e.g. numbers read from another column
+        self.read_only = set(read_only)
         self.bind('<Double-1>', self.on_double_click)
         self.entry = None
         self.current_item = None
@@ -151,6 +34,8 @@ class EditableTreeview(ttk.Treeview):
             return
         
         column_name = self["columns"][int(column[1]) - 1]
+        if column_name in self.read_only:
+            return
         x, y, w, h = self.bbox(item, column)
         
         self.entry = ttk.Entry(self, width=w//8)
@@ -184,12 +69,9 @@ class EditableTreeview(ttk.Treeview):
             values[self.current_column] = value
             self.item(self.current_item, values=values)
             
-            # Save to database
-            try: 
-                data = {col: val for col, val in zip(self["columns"], values)}
-                self.master.master.master.db.save_processed_data(pd.DataFrame([data]))
-            except Exception as e:
-                print(f"Error saving to database: {e}")
+            # The app applies it to the loaded rows and their stored copy
+            if self.on_edit is not None:
+                self.on_edit(self.index(self.current_item), self["columns"][self.current_column], value)
         else:
             messagebox.showwarning("Invalid Input", 
                 "Please enter between 3 and 15 characters.")
@@ -205,7 +87,7 @@ class PDFConverterApp:
         
         try:
             self.db = Database()
-            self.processor = PDFProcessor(self.db)
+            self.processor = PDFProcessor(self.db, "tddm")
         except Exception as e:
             messagebox.showerror("Error", f"Error initializing database: {str(e)}")
             self.db = None
@@ -243,7 +125,7 @@ class PDFConverterApp:
         preview_frame.pack(fill=tk.BOTH, expand=True)
         
         # Treeview
-        self.tree = EditableTreeview(preview_frame)
+        self.tree = EditableTreeview(preview_frame, on_edit=self.save_cell, read_only=DERIVED_COLUMNS)
         
         # Scrollbars
         vsb = ttk.Scrollbar(preview_frame, orient="vertical", 
@@ -298,12 +180,25 @@ class PDFConverterApp:
             return
         
         try:
-            self.current_df = self.processor.process_pdf(file_path)
-            self.update_preview()
+            with timings.run(file_path):
+                self.current_df = self.processor.process_pdf(file_path, workers=default_workers())
+                with timings.stage("update_preview"):
+                    self.update_preview()
             messagebox.showinfo("Success", "PDF processed successfully!")
         except Exception as e:
             messagebox.showerror("Error", f"Error processing PDF: {str(e)}")
     
+    def save_cell(self, row_index: int, column: str, value: str):
+        set_cell(self.current_df, row_index, column, value)
+        # A limit edit also sets its Months and FH columns
+        self.tree.item(self.tree.get_children()[row_index],
+                       values=list(display_frame(self.current_df.iloc[[row_index]]).iloc[0]))
+        try:
+            # Updates the document's stored row rather than adding one
+            self.processor.save_edit(row_index, column, value)
+        except Exception as e:
+            print(f"Error saving to database: {e}")
+    
     def update_preview(self):
         for item in self.tree.get_children():
             self.tree.delete(item)
@@ -315,7 +210,7 @@ class PDFConverterApp:
             self.tree.heading(column, text=column)
             self.tree.column(column, width=100)
         
-        for _, row in self.current_df.iterrows():
+        for _, row in display_frame(self.current_df).iterrows():
             self.tree.insert("", "end", values=list(row))
     
     def export_excel(self):
@@ -326,14 +221,18 @@ class PDFConverterApp:
         file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
         if file_path:
             try:
-                self.current_df.to_excel(file_path, index=False, sheet_name='Extracted Data')
+                display_frame(self.current_df).to_excel(file_path, index=False, sheet_name='Extracted Data')
                 messagebox.showinfo("Success", "Data exported successfully!")
             except Exception as e:
                 messagebox.showerror("Error", f"Error exporting to Excel: {str(e)}")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = PDFConverterApp(root)
+    # Launched from the main window's format detection with the PDF to convert
+    if len(sys.argv) > 1:
+        app.file_path_var.set(sys.argv[1])
     root.mainloop()
     c=PDFProcessor()
     c.main()
\ No newline at end of file
@@ -0,0 +1,20 @@
+import json
+import os
+
+import pytest
+
+from descriptions import _END_PATTERNS, _legacy_description, description_after
+from extraction_engine import task_spans
+
+# Task contexts from sample manuals plus hand-written awkward ones (see descriptions._record)
+with open(os.path.join(os.path.dirname(__file__), "data", "description_contexts.json"), encoding="utf-8") as f:
+    CONTEXTS = json.load(f)
+
+
+@pytest.mark.parametrize("layout", sorted(_END_PATTERNS))
+def test_description_after_matches_legacy_regex(layout):
+    end_pattern = _END_PATTERNS[layout]
+    for context in CONTEXTS:
+        span, = task_spans(context)
+        assert description_after(span.text, span.task_end, span.end, end_pattern) == \
+            _legacy_description(span.context, layout), context
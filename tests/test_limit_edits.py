@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from db_handler import Database
+from extraction_engine import FORMATS
+from frame_builder import build_frame, set_cell
+
+COLUMNS = FORMATS["tdmplm"].columns
+ROWS = [
+    ("62-11", "62/11/00/001/000/001", "INSPECT HUB", "355A12-0051-03", "-", "12 M", 12, None, "0", "ref"),
+    ("62-11", "62/11/00/002/000/001", "CHECK SHAFT", "355A12-0051-04", "-", "600 FH", None, 600, "0", "ref"),
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    return Database(str(tmp_path / "edits.db"))
+
+
+def _task_numbers(found):
+    return sorted(found["task_number"])
+
+
+def test_limit_edit_reaches_range_queries(db):
+    doc_id = db.save_document("hash", "tdmplm", "rules", "manual.pdf", build_frame(ROWS, COLUMNS))
+    assert _task_numbers(db.get_tasks_within(months=6)) == []
+
+    assert db.update_document_cell(doc_id, 0, "Limit", "3 M")
+    assert _task_numbers(db.get_tasks_within(months=6)) == ["62/11/00/001/000/001"]
+
+    # Now in flight hours: no longer within any number of months
+    assert db.update_document_cell(doc_id, 0, "Limit", "100 FH")
+    assert _task_numbers(db.get_tasks_within(months=24)) == []
+    assert _task_numbers(db.get_tasks_within(flight_hours=200)) == ["62/11/00/001/000/001"]
+
+    row = db.load_document(doc_id, COLUMNS).iloc[0]
+    assert row["Limit"] == "100 FH" and pd.isna(row["Limit Months"]) and row["Limit FH"] == 100
+
+
+def test_numeric_limit_columns_are_not_edited_on_their_own(db):
+    doc_id = db.save_document("hash", "tdmplm", "rules", "manual.pdf", build_frame(ROWS, COLUMNS))
+    assert not db.update_document_cell(doc_id, 0, "Limit Months", 3)
+    df = build_frame(ROWS, COLUMNS)
+    with pytest.raises(ValueError):
+        set_cell(df, 0, "Limit Months", 3)
+
+
+def test_set_cell_parses_limit():
+    df = build_frame(ROWS, COLUMNS)
+    set_cell(df, 1, "Limit", "6 M, 12 M")
+    assert df.loc[1, "Limit"] == "6 M, 12 M"
+    assert df.loc[1, "Limit Months"] == 6
+    assert pd.isna(df.loc[1, "Limit FH"])
@@ -0,0 +1,40 @@
+import pytest
+
+from mpn_matcher import MPNMatcher, _sequential, _sequential_match
+
+# Part-number dense lines, including overlapping shapes, lower case and
+# spaced-out variants
+CORPUS = [
+    "12/34/56/789/012/345 INSPECT MAIN ROTOR HUB 355A12-51 03-00 350A33-1 526-00 24 M",
+    "158210-1 579045 60081492E 60081491 E 1606-1 1606 - 1 17149-1 2928-2",
+    "LS210PS30 LS210PS3 FINLONTYPEFO Y51BB10843S1M73 INA36132A ina36132a",
+    "350A31-3020-20 350A33-2Q04-05 355A11-0020-01 350A75-1027-20 350A33-1 535-00",
+    "LB4-1231-1 LB6-1231-3-1 BL16600-12 BL16600 - 12 LB4 - 1231 - 1",
+    "REPLACE FILTER ELEMENT MAINTENANCE 709628-100 56995-0101 P94B12-207",
+    "355A12-51 03-00 -} 355A12-51 03-00} 350A31-191 7-00} 24 M TSM MET 21.51.10.601",
+    "704A33-633-091 (0001) 355A1 2-003 1-01 (-) ALL MP/N 6 M TSM CMM 25.69.87",
+    "",
+    "NO PART NUMBERS HERE AT ALL",
+]
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return MPNMatcher()
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_find_all_matches_sequential_loop(matcher, text):
+    assert matcher.find_all(text) == _sequential(text)
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_match_matches_sequential_loop(matcher, text):
+    for token in text.split():
+        assert matcher.match(token) == _sequential_match(token), token
+
+
+def test_find_all_on_a_page(matcher):
+    # Matches on one line mustn't hide overlapping ones on the next
+    page = "\n".join(CORPUS * 3)
+    assert matcher.find_all(page) == _sequential(page)
@@ -0,0 +1,65 @@
+import pytest
+
+import page_memory
+
+MB = page_memory.MB
+
+PAGES = 40
+LINES_PER_PAGE = 30
+# Growth allowed between the 10th and the last page; with every page kept
+# in memory it is well over 100MB for this document
+MAX_GROWTH = 30 * MB
+
+
+@pytest.fixture(scope="module")
+def pdf_path(tmp_path_factory):
+    canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+    path = str(tmp_path_factory.mktemp("pdf") / "pages.pdf")
+    c = canvas.Canvas(path)
+    for page in range(PAGES):
+        c.setFont("Helvetica", 6)
+        for line in range(LINES_PER_PAGE):
+            c.drawString(20, 800 - line * 8.5, f"62/11/00/{page:03d}/{line:03d}/001 INSPECT MAIN ROTOR HUB "
+                                               f"355A12-0051-03 24 M MET 21.51.10.601")
+        c.showPage()
+    c.save()
+    return path
+
+
+def test_resident_memory_stays_flat_across_pages(pdf_path):
+    if page_memory.rss_bytes() is None:
+        pytest.skip("resident memory can't be read here")
+    page_memory.set_limits()
+    samples = {}
+    for number, page in enumerate(page_memory.iter_plumber_pages(pdf_path, range(PAGES)), 1):
+        assert page.extract_text()
+        if number in (10, PAGES):
+            samples[number] = page_memory.rss_bytes()
+    assert len(samples) == 2
+    growth = samples[PAGES] - samples[10]
+    assert growth < MAX_GROWTH, f"resident memory grew {growth // MB}MB over {PAGES - 10} pages"
+
+
+class _OldPage:
+    # A pdfplumber page from before Page.close
+    def __init__(self):
+        self.flushed = False
+        self.textmaps_cleared = False
+
+        def get_textmap():
+            pass
+
+        def cache_clear():
+            self.textmaps_cleared = True
+
+        get_textmap.cache_clear = cache_clear
+        self.get_textmap = get_textmap
+
+    def flush_cache(self):
+        self.flushed = True
+
+
+def test_release_page_without_close():
+    page = _OldPage()
+    page_memory.release_page(page)
+    assert page.flushed and page.textmaps_cleared
@@ -0,0 +1,69 @@
+import pytest
+
+import word_columns
+from format_processor import PDFProcessor
+
+PAGES = 40
+# The only page with a table header, after the pages a template is learned from
+HEADER_PAGE = 12
+LINES_PER_PAGE = 20
+COLUMN_X = {"TASK": 20, "DESCRIPTION": 120, "MP/N": 280, "PN": 360, "LIMIT": 440, "DOCUMENTATION": 500}
+
+
+@pytest.fixture(scope="module")
+def pdf_path(tmp_path_factory):
+    canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+    path = str(tmp_path_factory.mktemp("pdf") / "late_header.pdf")
+    c = canvas.Canvas(path)
+    for page in range(1, PAGES + 1):
+        c.setFont("Helvetica", 6)
+        top = 800
+        if page == HEADER_PAGE:
+            for name, x in COLUMN_X.items():
+                c.drawString(x, top, name)
+            top -= 12
+        for line in range(LINES_PER_PAGE):
+            y = top - line * 12
+            cells = [f"62/11/00/{page:03d}/{line:03d}/001", "INSPECT MAIN ROTOR HUB", "355A12-0051-03",
+                     "355A12-0051-04", "24 M", "MET 21.51.10.601"]
+            for x, cell in zip(COLUMN_X.values(), cells):
+                c.drawString(x, y, cell)
+        c.showPage()
+    c.save()
+    return path
+
+
+@pytest.fixture(autouse=True)
+def template_cache(tmp_path, monkeypatch):
+    # Layout templates are cached per document; keep them out of data/cache
+    monkeypatch.setattr(word_columns, "cache_dir", lambda: str(tmp_path))
+
+
+def test_parallel_matches_serial_with_late_header(pdf_path):
+    processor = PDFProcessor(None, "tdmplm")
+    serial = list(word_columns.iter_word_pages(processor, pdf_path, workers=1, prefilter=False))
+    parallel = list(word_columns.iter_word_pages(processor, pdf_path, workers=4, prefilter=False))
+    assert sum(len(rows) for _, rows in serial) > 0
+    assert parallel == serial
+
+
+def test_template_learned_from_late_header(pdf_path):
+    template = word_columns.document_template(pdf_path, list(range(PAGES)))
+    assert template is not None
+    assert template.bands.columns == ["Task", "Description", "MP/N", "PN", "Limit", "Documentation"]
+
+
+def test_no_template_is_cached(tmp_path, monkeypatch):
+    canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+    path = str(tmp_path / "no_header.pdf")
+    c = canvas.Canvas(path)
+    c.drawString(20, 800, "62/11/00/001/000/001 INSPECT MAIN ROTOR HUB 24 M")
+    c.showPage()
+    c.save()
+    assert word_columns.document_template(path, [0]) is None
+
+    def learn_template(pdf_path, indices):
+        raise AssertionError("template learned again")
+
+    monkeypatch.setattr(word_columns, "learn_template", learn_template)
+    assert word_columns.document_template(path, [0]) is None
@@ -0,0 +1,156 @@
+"""
+Text extraction backends for the page pipeline.
+
+pdfplumber does full layout analysis, which the converters don't need:
+they only match regular expressions against lines of text. PyPDF2 reads the
+content stream directly and is an order of magnitude faster, but on some
+layouts it breaks lines differently. A backend is chosen per document by
+name, or with "auto" (see page_pipeline.choose_backend), which uses PyPDF2
+only where the converter gets the same rows out of it as out of pdfplumber.
+
+Run this module directly to compare the backends on a PDF.
+"""
+import re
+import sys
+from typing import Iterator, List, Optional, Tuple
+
+import pdfplumber
+import PyPDF2
+
+import timings
+from page_memory import iter_plumber_pages
+
+AUTO = "auto"
+DEFAULT_BACKEND = "pdfplumber"
+
+# Not a text backend: table cells from pdfplumber word positions (see word_columns)
+WORDS = "words"
+
+_HORIZONTAL_SPACE = re.compile(r"[ \t]+")
+
+
+class TextBackend:
+    """Turns the pages of a PDF into text, one string (or None) per page."""
+    name = ""
+    version = ""
+
+    @property
+    def extractor(self) -> str:
+        # Recorded with stored text: another version may lay pages out differently
+        return f"{self.name} {self.version}"
+
+    def page_count(self, pdf_path: str) -> int:
+        raise NotImplementedError
+
+    def iter_texts(self, pdf_path: str, start: int = 0,
+                   stop: int = None) -> Iterator[Tuple[int, Optional[str]]]:
+        """Yield (page_number, text) for pages [start, stop), numbered from 1."""
+        raise NotImplementedError
+
+    def iter_selected_texts(self, pdf_path: str,
+                            indices: List[int]) -> Iterator[Tuple[int, Optional[str]]]:
+        """Yield (page_number, text) for the pages at the given 0-based indices."""
+        for index in indices:
+            yield from self.iter_texts(pdf_path, index, index + 1)
+
+
+class PdfplumberBackend(TextBackend):
+    name = "pdfplumber"
+    version = pdfplumber.__version__
+
+    def page_count(self, pdf_path: str) -> int:
+        with pdfplumber.open(pdf_path) as pdf:
+            return len(pdf.pages)
+
+    def iter_texts(self, pdf_path: str, start: int = 0,
+                   stop: int = None) -> Iterator[Tuple[int, Optional[str]]]:
+        # Like a slice: iter_plumber_pages stops at the last page
+        return self.iter_selected_texts(pdf_path, range(start, sys.maxsize if stop is None else stop))
+
+    def iter_selected_texts(self, pdf_path: str,
+                            indices: List[int]) -> Iterator[Tuple[int, Optional[str]]]:
+        # Opening is a good part of the cost on large documents, so it is
+        # done once (or once per chunk in bounded-memory mode)
+        for page in iter_plumber_pages(pdf_path, indices):
+            with timings.stage("pdfplumber.extract_text"):
+                text = page.extract_text()
+            yield page.page_number, text
+
+
+class PyPDF2Backend(TextBackend):
+    name = "pypdf2"
+    version = PyPDF2.__version__
+
+    def page_count(self, pdf_path: str) -> int:
+        with open(pdf_path, "rb") as f:
+            return len(PyPDF2.PdfReader(f).pages)
+
+    def iter_texts(self, pdf_path: str, start: int = 0,
+                   stop: int = None) -> Iterator[Tuple[int, Optional[str]]]:
+        with open(pdf_path, "rb") as f:
+            pages = PyPDF2.PdfReader(f).pages
+            stop = len(pages) if stop is None else min(stop, len(pages))
+            for index in range(start, stop):
+                with timings.stage("pypdf2.extract_text"):
+                    text = self.normalize(pages[index].extract_text())
+                yield index + 1, text
+
+    def iter_selected_texts(self, pdf_path: str,
+                            indices: List[int]) -> Iterator[Tuple[int, Optional[str]]]:
+        with open(pdf_path, "rb") as f:
+            pages = PyPDF2.PdfReader(f).pages
+            for index in indices:
+                with timings.stage("pypdf2.extract_text"):
+                    text = self.normalize(pages[index].extract_text())
+                yield index + 1, text
+
+    @staticmethod
+    def normalize(text: Optional[str]) -> Optional[str]:
+        # PyPDF2 keeps runs of spaces, leading spaces and blank lines that
+        # pdfplumber collapses; the converters' context windows count lines
+        if text is None:
+            return None
+        lines = (_HORIZONTAL_SPACE.sub(" ", line).strip() for line in text.split("\n"))
+        return "\n".join(line for line in lines if line)
+
+
+BACKENDS = {backend.name: backend for backend in [PdfplumberBackend(), PyPDF2Backend()]}
+
+
+def get_backend(name: str) -> TextBackend:
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown text backend: {name} (choose from {', '.join(BACKENDS)}, {AUTO} or {WORDS})")
+
+
+def _compare(pdf_path: str, converter: str):
+    import time
+
+    from format_processor import PDFProcessor
+    from page_pipeline import _page_rows, choose_backend
+
+    processor = PDFProcessor(None, converter)
+    results = {}
+    for name, backend in BACKENDS.items():
+        start = time.perf_counter()
+        texts = [text for _, text in backend.iter_texts(pdf_path)]
+        elapsed = time.perf_counter() - start
+        results[name] = [_page_rows(processor, text) for text in texts]
+        print(f"{name:>10}: {len(texts)} pages in {elapsed:.2f}s ({len(texts) / elapsed:.1f} pages/s), "
+              f"{sum(len(rows) for rows in results[name])} rows")
+
+    reference, fast = results["pdfplumber"], results["pypdf2"]
+    same_pages = sum(a == b for a, b in zip(reference, fast))
+    same_rows = sum(a == b for ref_rows, fast_rows in zip(reference, fast)
+                    for a, b in zip(ref_rows, fast_rows))
+    print(f"parity: {same_pages}/{len(reference)} pages, "
+          f"{same_rows}/{sum(len(rows) for rows in reference)} rows identical")
+    start = time.perf_counter()
+    chosen, _ = choose_backend(processor, pdf_path)
+    print(f"auto: {chosen.name} (decided in {time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    # python text_backends.py <pdf> [converter]
+    _compare(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "tdmplm")
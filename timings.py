@@ -0,0 +1,225 @@
+"""
+Per-stage timing of the extraction pipeline.
+
+    with timings.stage("pdfplumber.extract_text"):
+        text = page.extract_text()
+    timings.count("pages")
+
+Off unless the EXTRACT_TIMINGS environment variable is set (batch_cli
+--timings sets it): stage() then hands back one shared do-nothing context
+manager and count() returns straight away. When on, each stage keeps its
+number of calls, total and slowest time and a histogram of call durations
+-- per page, for the stages that run once a page -- and every run (see
+run()) writes them to a JSON report under data/timings along with rows/sec
+and pages/sec. Stages nest, so an outer stage's time includes its inner
+ones.
+
+Worker processes time their own stages; the page pipeline sends a
+snapshot back with each chunk of results and the parent merges it in, so
+with workers a stage's total can exceed the run's wall time.
+
+Run this module to measure what the instrumentation costs when off.
+"""
+import bisect
+import functools
+import json
+import os
+import re
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, Optional
+
+from ensure_directories import ensure_app_directories
+
+TIMINGS_ENV = "EXTRACT_TIMINGS"
+
+# Upper bounds (ms) of the duration histogram's buckets; one more bucket above
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+_OFF = nullcontext()
+
+enabled = bool(os.environ.get(TIMINGS_ENV))
+
+# stage name -> [calls, total seconds, slowest seconds, bucket counts]
+_stages: Dict[str, list] = {}
+_counters: Dict[str, int] = {}
+_run_depth = 0
+
+
+def enable(on: bool = True):
+    """Turn timing on (or off) for this process and the worker processes it starts."""
+    global enabled
+    enabled = on
+    if on:
+        os.environ[TIMINGS_ENV] = "1"
+    else:
+        os.environ.pop(TIMINGS_ENV, None)
+
+
+def _entry(name: str) -> list:
+    entry = _stages.get(name)
+    if entry is None:
+        entry = _stages[name] = [0, 0.0, 0.0, [0] * (len(BUCKETS_MS) + 1)]
+    return entry
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        entry = _entry(self.name)
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        entry[3][bisect.bisect_left(BUCKETS_MS, seconds * 1e3)] += 1
+        return False
+
+
+def stage(name: str):
+    """Context manager timing one call of a stage."""
+    return _Timer(name) if enabled else _OFF
+
+
+def timed(name: str):
+    """Decorator timing every call of a function as a stage."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, amount: int = 1):
+    if enabled:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def reset():
+    """Forget what was recorded; also the initializer of worker pools, so that
+    a worker forked mid-run doesn't report its parent's stages as its own."""
+    _stages.clear()
+    _counters.clear()
+
+
+def snapshot() -> Optional[dict]:
+    """Stages and counters recorded in this process since the last snapshot (None when off)."""
+    if not enabled:
+        return None
+    data = {"stages": dict(_stages), "counters": dict(_counters)}
+    reset()
+    return data
+
+
+def merge(data: Optional[dict]):
+    """Add a snapshot from another process."""
+    if not data:
+        return
+    for name, (calls, seconds, slowest, buckets) in data["stages"].items():
+        entry = _entry(name)
+        entry[0] += calls
+        entry[1] += seconds
+        entry[2] = max(entry[2], slowest)
+        entry[3] = [mine + theirs for mine, theirs in zip(entry[3], buckets)]
+    for name, amount in data["counters"].items():
+        count(name, amount)
+
+
+def _bucket_labels() -> list:
+    bounds = [0] + BUCKETS_MS
+    return [f"{low}-{high}ms" for low, high in zip(bounds, BUCKETS_MS)] + [f">{BUCKETS_MS[-1]}ms"]
+
+
+def report(label: str, seconds: float) -> dict:
+    labels = _bucket_labels()
+    stages = {}
+    for name, (calls, total, slowest, buckets) in sorted(_stages.items(), key=lambda item: -item[1][1]):
+        stages[name] = {
+            "calls": calls,
+            "seconds": round(total, 6),
+            "mean_ms": round(total / calls * 1e3, 3),
+            "max_ms": round(slowest * 1e3, 3),
+            "histogram": {bucket: n for bucket, n in zip(labels, buckets) if n},
+        }
+    rows, pages = _counters.get("rows", 0), _counters.get("pages", 0)
+    return {
+        "run": label,
+        "pid": os.getpid(),
+        "seconds": round(seconds, 6),
+        "rows": rows,
+        "pages": pages,
+        "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+        "pages_per_sec": round(pages / seconds, 1) if seconds else None,
+        "counters": dict(_counters),
+        "stages": stages,
+    }
+
+
+def report_dir() -> str:
+    data_dir, _ = ensure_app_directories()
+    path = os.path.join(data_dir, "timings")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_report(data: dict) -> Optional[str]:
+    name = re.sub(r"[^\w.-]+", "_", os.path.basename(data["run"]))
+    path = os.path.join(report_dir(), f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{data['pid']}.json")
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+    except Exception as e:
+        print(f"Timing report error: {str(e)}")
+        return None
+    return path
+
+
+@contextmanager
+def run(label: str) -> Iterator[None]:
+    """
+    One report for everything timed inside, written when the outermost
+    run ends; runs started inside another are part of it.
+    """
+    global _run_depth
+    if not enabled:
+        yield
+        return
+    _run_depth += 1
+    if _run_depth > 1:
+        try:
+            yield
+        finally:
+            _run_depth -= 1
+        return
+    reset()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _run_depth -= 1
+        path = write_report(report(label, time.perf_counter() - start))
+        if path:
+            print(f"Timings: {path}")
+
+
+if __name__ == "__main__":
+    # Cost of an instrumented call with timing off, and on
+    import timeit
+
+    calls = 1_000_000
+    for on in [False, True]:
+        enable(on)
+        seconds = timeit.timeit("with stage('x'): pass", globals=globals(), number=calls)
+        print(f"{'on' if on else 'off':>3}: {seconds / calls * 1e9:.0f} ns per stage")
+    enable(False)
+    seconds = timeit.timeit("pass", number=calls)
+    print(f"bare loop: {seconds / calls * 1e9:.0f} ns")
@@ -0,0 +1,413 @@
+"""
+Column-band extraction: table cells from pdfplumber word positions instead
+of regular expressions over joined lines.
+
+The line extractors join a task line with the next two and guess where the
+description ends and the MP/N, limit and documentation columns begin. A
+description wrapped onto a third line, or an MP/N list longer than that,
+ends up in the wrong field. Here the table's header row ("TASK",
+"DESCRIPTION", "MP/N", "PN", "LIMIT", "DOCUMENTATION" and the usual
+variants) gives the x position where each column starts. Every word on the
+page is binned into a column by its x0 and into a task record by its line,
+with NumPy, and each cell's text goes straight to the field that reads it
+(see extraction_engine.CELL_FIELD_EXTRACTORS).
+
+Column geometry rarely changes within a document, so it is learned once,
+from the first few pages with a header (however far into the document the
+first one is), as a LayoutTemplate: where each column starts and the band
+of the page the table occupies. The template -- or the finding that the
+document has no header at all -- is cached per document hash, and every
+page is then cropped to that band before its words are read (or, when the
+band is most of the page, its words are filtered to it), which leaves page
+headers and footers -- and header detection -- out of the per-page work. A
+page whose table region holds no task gets a full look of its own.
+
+Without a template, a page with no recognisable header uses the header of
+the page before it; until one has been seen, pages go through the line
+extractors on pdfplumber's text as before. Such documents are read
+serially, so the result doesn't depend on the number of workers. Selected
+with the "words" backend.
+"""
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pdfplumber
+
+import patterns
+import timings
+from page_memory import iter_plumber_pages
+from page_pipeline import MIN_PARALLEL_PAGES, _page_rows, page_ranges, prescan_pages
+from result_cache import cache_dir, file_hash
+
+# Header word(s) of each column, matched against whole words
+COLUMN_HEADERS = {
+    "Task": re.compile(r"TASKS?", re.IGNORECASE),
+    "Description": re.compile(r"DESCRIPTION|DESIGNATION|TITLE", re.IGNORECASE),
+    "MP/N": re.compile(r"MP/?Ns?", re.IGNORECASE),
+    "PN": re.compile(r"P/?Ns?", re.IGNORECASE),
+    "Limit": re.compile(r"LIMITS?|INTERVALS?|THRESHOLD", re.IGNORECASE),
+    "Documentation": re.compile(r"DOC(?:UMENTATION|UMENTS?)?|REF(?:ERENCES?)?", re.IGNORECASE),
+}
+COLUMNS = list(COLUMN_HEADERS)
+
+# Words whose tops differ by less than this (in points) are on one line
+LINE_TOLERANCE = 3.0
+
+# Cell text may start a little left of its header
+BAND_SLACK = 2.0
+
+# A gap this many times the usual line spacing ends a task record, so page
+# footers don't join the last task
+RECORD_GAP = 2.5
+
+# Pages with a header a template is learned from, and how many pages from
+# the first one may be looked at to find them
+TEMPLATE_PAGES = 3
+TEMPLATE_SCAN_PAGES = 10
+
+# Bump when the template file layout or the way it is learned changes
+TEMPLATE_FORMAT = 2
+
+# Cropping is itself a pass over every object on the page, so it only pays
+# off when the table leaves a good share of the page out; otherwise words
+# outside the table band are dropped after extraction
+CROP_MAX_SHARE = 0.75
+
+
+class ColumnBands:
+    """Columns of a table and the x position each one starts at."""
+
+    def __init__(self, starts: Dict[str, float]):
+        ordered = sorted(starts.items(), key=lambda item: item[1])
+        self.columns = [name for name, _ in ordered]
+        self.edges = np.array([x for _, x in ordered]) - BAND_SLACK
+
+    def assign(self, x0: np.ndarray) -> np.ndarray:
+        """Column index of each word start; -1 left of the first column."""
+        return np.searchsorted(self.edges, x0, side="right") - 1
+
+
+class LayoutTemplate:
+    """Column starts and the vertical band the table occupies on a page."""
+
+    def __init__(self, starts: Dict[str, float], top: float, bottom: Optional[float] = None):
+        self.starts = starts
+        self.top = top
+        # None: the table may run to the bottom of the page
+        self.bottom = bottom
+        self.bands = ColumnBands(starts)
+
+    def region(self, page) -> Tuple[float, float, float, float]:
+        """The table's bounding box on ``page``."""
+        x0, top, x1, bottom = page.bbox
+        table_top = max(top, min(self.top, bottom))
+        table_bottom = bottom if self.bottom is None else max(table_top, min(self.bottom, bottom))
+        return max(x0, self.bands.edges[0] - BAND_SLACK), table_top, x1, table_bottom
+
+    def words(self, page) -> List[dict]:
+        """Words of ``page`` inside the table region."""
+        region = self.region(page)
+        x0, top, x1, bottom = page.bbox
+        if (region[3] - region[1]) * (region[2] - region[0]) <= CROP_MAX_SHARE * (bottom - top) * (x1 - x0):
+            # Objects partly outside are left out rather than clipped, which is cheaper
+            return page.within_bbox(region).extract_words()
+        return [word for word in page.extract_words()
+                if word["x0"] >= region[0] and word["top"] >= region[1] and word["bottom"] <= region[3]]
+
+    def to_dict(self) -> dict:
+        return {"format": TEMPLATE_FORMAT, "starts": self.starts, "top": self.top, "bottom": self.bottom}
+
+    def fingerprint(self) -> str:
+        # Rows read through this template are only valid for the same template
+        return hashlib.sha256(json.dumps(self.to_dict(), sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Optional["LayoutTemplate"]:
+        if data.get("format") != TEMPLATE_FORMAT:
+            return None
+        return cls(data["starts"], data["top"], data["bottom"])
+
+
+def _lines(tops: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Line number of each word, and the top of each line
+    order = np.argsort(tops, kind="stable")
+    sorted_tops = tops[order]
+    new_line = np.empty(len(tops), dtype=bool)
+    new_line[:1] = True
+    new_line[1:] = np.diff(sorted_tops) > LINE_TOLERANCE
+    line_ids = np.empty(len(tops), dtype=np.int64)
+    line_ids[order] = np.cumsum(new_line) - 1
+    return line_ids, sorted_tops[new_line]
+
+
+def find_header(words: List[dict], line_ids: np.ndarray) -> Tuple[Optional[ColumnBands], int]:
+    """Bands from the first line naming the Task column and at least one other, and that line's number."""
+    starts_by_line: Dict[int, Dict[str, float]] = {}
+    for word, line_id in zip(words, line_ids.tolist()):
+        for name, pattern in COLUMN_HEADERS.items():
+            if pattern.fullmatch(word["text"].strip(":.")):
+                starts_by_line.setdefault(line_id, {}).setdefault(name, word["x0"])
+                break
+    for line_id in sorted(starts_by_line):
+        starts = starts_by_line[line_id]
+        if "Task" in starts and len(starts) > 1:
+            return ColumnBands(starts), line_id
+    return None, -1
+
+
+def _task_starts(words: List[dict], bands: ColumnBands, line_ids: np.ndarray, columns: np.ndarray,
+                 header_line: int) -> np.ndarray:
+    # Lines with a task number in the Task column, below the header
+    is_task = np.fromiter((patterns.TASK_NUMBER_ANYWHERE.search(word["text"]) is not None for word in words),
+                          dtype=bool, count=len(words))
+    return np.unique(line_ids[is_task & (columns == bands.columns.index("Task")) & (line_ids > header_line)])
+
+
+def _record_lines(starts: np.ndarray, line_tops: np.ndarray) -> np.ndarray:
+    # Lines after a wide gap (a footer, the next table) belong to no record
+    spacing = np.median(np.diff(line_tops)) if len(line_tops) > 1 else 0.0
+    keep_line = np.zeros(len(line_tops), dtype=bool)
+    for start, stop in zip(starts, list(starts[1:]) + [len(line_tops)]):
+        keep_line[start] = True
+        for line_id in range(start + 1, stop):
+            if line_tops[line_id] - line_tops[line_id - 1] > RECORD_GAP * spacing:
+                break
+            keep_line[line_id] = True
+    return keep_line
+
+
+def task_records(words: List[dict], bands: ColumnBands, line_ids: np.ndarray,
+                 line_tops: np.ndarray, header_line: int = -1) -> List[Dict[str, list]]:
+    """
+    One record per task number in the Task column: {column: [(line number,
+    text), ...]} for every cell it has, columns left to right.
+    """
+    x0 = np.fromiter((word["x0"] for word in words), dtype=float, count=len(words))
+    columns = bands.assign(x0)
+    below_header = line_ids > header_line
+
+    starts = _task_starts(words, bands, line_ids, columns, header_line)
+    if not len(starts):
+        return []
+
+    keep_line = _record_lines(starts, line_tops)
+    record_ids = np.searchsorted(starts, line_ids, side="right") - 1
+    keep = below_header & keep_line[line_ids] & (record_ids >= 0) & (columns >= 0)
+    index = np.flatnonzero(keep)
+    index = index[np.lexsort((x0[index], line_ids[index], columns[index], record_ids[index]))]
+
+    records = [{} for _ in starts]
+    previous = None
+    for i in index.tolist():
+        key = (record_ids[i], columns[i], line_ids[i])
+        cell = records[key[0]].setdefault(bands.columns[key[1]], [])
+        if key == previous:
+            cell[-1] = (cell[-1][0], f"{cell[-1][1]} {words[i]['text']}")
+        else:
+            cell.append((int(key[2]), words[i]["text"]))
+        previous = key
+    return records
+
+
+def _page_records_rows(processor, page, bands: Optional[ColumnBands]) -> Tuple[list, Optional[ColumnBands]]:
+    with timings.stage("pdfplumber.extract_words"):
+        words = page.extract_words()
+    if not words:
+        return [], bands
+    line_ids, line_tops = _lines(np.fromiter((word["top"] for word in words), dtype=float, count=len(words)))
+    found, header_line = find_header(words, line_ids)
+    bands = found or bands
+    if bands is None:
+        return _page_rows(processor, page.extract_text()), None
+    records = task_records(words, bands, line_ids, line_tops, header_line)
+    if not records:
+        return [], bands
+    with timings.stage("extract_rows"):
+        return processor.extract_record_rows(records), bands
+
+
+def _page_template_rows(processor, page, template: LayoutTemplate) -> list:
+    with timings.stage("pdfplumber.extract_words"):
+        words = template.words(page)
+    if words:
+        line_ids, line_tops = _lines(np.fromiter((word["top"] for word in words), dtype=float, count=len(words)))
+        records = task_records(words, template.bands, line_ids, line_tops)
+        if records:
+            with timings.stage("extract_rows"):
+                return processor.extract_record_rows(records)
+    # Nothing where the template puts the table: look at the whole page
+    rows, _ = _page_records_rows(processor, page, template.bands)
+    return rows
+
+
+def _iter_page_results(processor, pdf_path: str, indices: List[int],
+                       template: Optional[LayoutTemplate]) -> Iterator[Tuple[int, list]]:
+    bands = None
+    for page in iter_plumber_pages(pdf_path, indices):
+        if template is not None:
+            rows = _page_template_rows(processor, page, template)
+        else:
+            rows, bands = _page_records_rows(processor, page, bands)
+        yield page.page_number, rows
+
+
+def _extract_word_pages(processor_cls, processor_args: dict, pdf_path: str, indices: List[int],
+                        template: Optional[LayoutTemplate]) -> Tuple[List[Tuple[int, list]], Optional[dict]]:
+    # Runs in a worker process, like page_pipeline._extract_pages
+    processor = processor_cls(None, **processor_args)
+    return list(_iter_page_results(processor, pdf_path, indices, template)), timings.snapshot()
+
+
+def learn_template(pdf_path: str, indices: List[int]) -> Optional[LayoutTemplate]:
+    """
+    Template from the first pages (among ``indices``) with a header: the
+    median start of each column, the highest header bottom as the top of
+    the table, and the footer line as its bottom when every sampled page
+    has one in the same place. None if no page has a header.
+    """
+    starts, tops, footers = [], [], []
+    scan_end = None
+    for position, page in enumerate(iter_plumber_pages(pdf_path, indices)):
+        if scan_end is not None and position >= scan_end:
+            break
+        words = page.extract_words()
+        if not words:
+            continue
+        line_ids, line_tops = _lines(np.fromiter((word["top"] for word in words), dtype=float, count=len(words)))
+        bands, header_line = find_header(words, line_ids)
+        if bands is None or (starts and bands.columns != list(starts[0])):
+            continue
+        if not starts:
+            # The first header: the template's other pages are looked for near it
+            scan_end = position + TEMPLATE_SCAN_PAGES
+        starts.append(dict(zip(bands.columns, (bands.edges + BAND_SLACK).tolist())))
+        tops.append(max(word["bottom"] for word, line_id in zip(words, line_ids) if line_id == header_line))
+
+        columns = bands.assign(np.fromiter((word["x0"] for word in words), dtype=float, count=len(words)))
+        task_starts = _task_starts(words, bands, line_ids, columns, header_line)
+        if len(task_starts):
+            keep_line = _record_lines(task_starts, line_tops)
+            dropped = np.flatnonzero(~keep_line[task_starts[-1]:]) + task_starts[-1]
+            footers.append(float(line_tops[dropped[0]]) if len(dropped) else None)
+        else:
+            footers.append(None)
+        if len(starts) >= TEMPLATE_PAGES:
+            break
+    if not starts:
+        return None
+
+    bottom = None
+    if None not in footers and max(footers) - min(footers) <= LINE_TOLERANCE:
+        bottom = min(footers) - LINE_TOLERANCE
+    return LayoutTemplate({name: float(np.median([page[name] for page in starts])) for name in starts[0]},
+                          min(tops), bottom)
+
+
+def _template_path(doc_hash: str) -> str:
+    return os.path.join(cache_dir(), f"layout-{doc_hash[:32]}.json")
+
+
+def load_template(doc_hash: str) -> Tuple[bool, Optional[LayoutTemplate]]:
+    """Whether the document's template is cached, and the template (None for a document without a header)."""
+    path = _template_path(doc_hash)
+    if not os.path.exists(path):
+        return False, None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"Layout template load error: {str(e)}")
+        return False, None
+    if data.get("format") != TEMPLATE_FORMAT:
+        return False, None
+    if data.get("starts") is None:
+        return True, None
+    return True, LayoutTemplate.from_dict(data)
+
+
+def save_template(doc_hash: str, template: Optional[LayoutTemplate]):
+    path = _template_path(doc_hash)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    # No template is cached too, so the whole document isn't searched for a header again
+    data = template.to_dict() if template is not None else {"format": TEMPLATE_FORMAT, "starts": None}
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Layout template save error: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def document_template(pdf_path: str, indices: List[int]) -> Optional[LayoutTemplate]:
+    """The document's cached template, learned and cached first if need be."""
+    doc_hash = file_hash(pdf_path)
+    cached, template = load_template(doc_hash)
+    if not cached:
+        with timings.stage("learn_template"):
+            template = learn_template(pdf_path, indices)
+        save_template(doc_hash, template)
+    return template
+
+
+def _iter_word_results(processor, pdf_path: str, indices: List[int], template: Optional[LayoutTemplate],
+                       workers: int) -> Iterator[Tuple[int, list]]:
+    # Without a template each page's bands depend on the pages before it,
+    # which a chunk starting mid-document hasn't seen: read serially
+    if template is not None and workers > 1 and len(indices) >= MIN_PARALLEL_PAGES:
+        chunks = [indices[start:stop] for start, stop in page_ranges(len(indices), workers)]
+        processor_args = processor.worker_args() if hasattr(processor, "worker_args") else {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=timings.reset) as executor:
+            for chunk, chunk_timings in executor.map(_extract_word_pages,
+                                                     [type(processor)] * len(chunks),
+                                                     [processor_args] * len(chunks),
+                                                     [pdf_path] * len(chunks),
+                                                     chunks,
+                                                     [template] * len(chunks)):
+                timings.merge(chunk_timings)
+                yield from chunk
+        return
+    yield from _iter_page_results(processor, pdf_path, indices, template)
+
+
+def iter_word_pages(processor, pdf_path: str, workers: int = 1,
+                    prefilter: bool = True) -> Iterator[Tuple[int, list]]:
+    """(page_number, rows) for every page, in page order, from column bands."""
+    with pdfplumber.open(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+    indices = list(range(page_count))
+    if prefilter:
+        with timings.stage("prescan"):
+            candidates, _ = prescan_pages(pdf_path)
+        if candidates is not None:
+            indices = candidates
+    template = document_template(pdf_path, indices)
+    yield from _fill_skipped(_iter_word_results(processor, pdf_path, indices, template, workers), page_count)
+
+
+def iter_selected_word_pages(processor, pdf_path: str, indices: List[int],
+                             workers: int = 1) -> Iterator[Tuple[int, list]]:
+    """(page_number, rows) for just the pages at the given 0-based indices."""
+    with pdfplumber.open(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+    # Learned from the document's first pages, wherever the selection starts
+    template = document_template(pdf_path, list(range(page_count)))
+    yield from _iter_word_results(processor, pdf_path, indices, template, workers)
+
+
+def _fill_skipped(results: Iterator[Tuple[int, list]], page_count: int) -> Iterator[Tuple[int, list]]:
+    # Pages the pre-scan ruled out come through with no rows
+    next_page = 1
+    for page_number, rows in results:
+        for skipped_page in range(next_page, page_number):
+            yield skipped_page, []
+        yield page_number, rows
+        next_page = page_number + 1
+    for skipped_page in range(next_page, page_count + 1):
+        yield skipped_page, []